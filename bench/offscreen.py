@@ -0,0 +1,85 @@
+import ctypes
+import os
+
+
+def select_backend(backend: str) -> str:
+    # precisa rodar antes de qualquer import do OpenGL
+    if backend == "auto":
+        backend = "glfw" if os.environ.get("DISPLAY") else "egl"
+    if backend == "egl":
+        os.environ.setdefault("PYOPENGL_PLATFORM", "egl")
+        # Mesa sem servidor grafico (ex.: llvmpipe em CI)
+        os.environ.setdefault("EGL_PLATFORM", "surfaceless")
+    return backend
+
+
+def create_context(backend: str, width: int, height: int):
+    # devolve uma funcao que destroi o contexto
+    if backend == "egl":
+        return _create_egl_context(width, height)
+    return _create_glfw_context(width, height)
+
+
+def _create_egl_context(width, height):
+    from OpenGL import EGL
+
+    display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+    if not EGL.eglInitialize(display, None, None):
+        raise RuntimeError("eglInitialize falhou")
+
+    config_attribs = (EGL.EGLint * 13)(
+        EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT,
+        EGL.EGL_RED_SIZE, 8, EGL.EGL_GREEN_SIZE, 8, EGL.EGL_BLUE_SIZE, 8,
+        EGL.EGL_DEPTH_SIZE, 24,
+        EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT,
+        EGL.EGL_NONE)
+    config = EGL.EGLConfig()
+    config_count = EGL.EGLint()
+    EGL.eglChooseConfig(display, config_attribs, ctypes.pointer(config), 1,
+                        ctypes.pointer(config_count))
+    if config_count.value == 0:
+        raise RuntimeError("nenhuma configuracao EGL com OpenGL")
+
+    surface = EGL.eglCreatePbufferSurface(display, config, (EGL.EGLint * 5)(
+        EGL.EGL_WIDTH, width, EGL.EGL_HEIGHT, height, EGL.EGL_NONE))
+
+    EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+    context = EGL.eglCreateContext(display, config, EGL.EGL_NO_CONTEXT, (EGL.EGLint * 7)(
+        EGL.EGL_CONTEXT_MAJOR_VERSION, 3, EGL.EGL_CONTEXT_MINOR_VERSION, 3,
+        EGL.EGL_CONTEXT_OPENGL_PROFILE_MASK, EGL.EGL_CONTEXT_OPENGL_CORE_PROFILE_BIT,
+        EGL.EGL_NONE))
+    if not EGL.eglMakeCurrent(display, surface, surface, context):
+        raise RuntimeError("eglMakeCurrent falhou")
+
+    def destroy():
+        EGL.eglMakeCurrent(display, EGL.EGL_NO_SURFACE, EGL.EGL_NO_SURFACE,
+                           EGL.EGL_NO_CONTEXT)
+        EGL.eglDestroyContext(display, context)
+        EGL.eglDestroySurface(display, surface)
+        EGL.eglTerminate(display)
+
+    return destroy
+
+
+def _create_glfw_context(width, height):
+    import glfw
+
+    if not glfw.init():
+        raise RuntimeError("glfw.init falhou")
+
+    glfw.window_hint(glfw.VISIBLE, glfw.FALSE)
+    glfw.window_hint(glfw.CONTEXT_VERSION_MAJOR, 3)
+    glfw.window_hint(glfw.CONTEXT_VERSION_MINOR, 3)
+    glfw.window_hint(glfw.OPENGL_PROFILE, glfw.OPENGL_CORE_PROFILE)
+    window = glfw.create_window(width, height, "bench", None, None)
+    if not window:
+        glfw.terminate()
+        raise RuntimeError("nao foi possivel criar a janela oculta")
+    glfw.make_context_current(window)
+    glfw.swap_interval(0)
+
+    def destroy():
+        glfw.destroy_window(window)
+        glfw.terminate()
+
+    return destroy
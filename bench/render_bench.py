@@ -0,0 +1,69 @@
+import time
+
+import numpy as np
+from OpenGL.GL import *
+
+from scenes import InputScript, build_scene
+
+FRAME_DELTA_TIME = 1.0 / 60.0
+
+
+def create_game(width: int, height: int):
+    # o contexto GL ja deve estar ativo (ver offscreen.create_context);
+    # devolve o jogo com todos os assets e o tempo ate o primeiro frame
+    from game import Game
+
+    start = time.perf_counter()
+    game = Game(headless=True)
+    game.width, game.height = width, height
+    glViewport(0, 0, width, height)
+
+    game.load_assets()
+    game.render()
+    glFinish()
+    first_frame_ms = (time.perf_counter() - start) * 1000.0
+
+    game.load_assets(critical_only=False)
+    all_assets_ms = (time.perf_counter() - start) * 1000.0
+    return game, {
+        "time_to_first_frame_ms": first_frame_ms,
+        "all_assets_ms": all_assets_ms,
+    }
+
+
+def gl_info() -> dict:
+    return {
+        "renderer": glGetString(GL_RENDERER).decode(),
+        "version": glGetString(GL_VERSION).decode(),
+    }
+
+
+def bench_render(game, count: int, seed: int, frames: int) -> dict:
+    # a simulacao avanca entre os frames, mas so o render (ate o glFinish)
+    # entra na medicao
+    game.set_simulation(build_scene(count, seed, frames * FRAME_DELTA_TIME))
+    inputs = InputScript(seed + 1)
+    frame_times = np.empty(frames)
+
+    # aquecimento (compilacao de shaders, primeiros uploads)
+    game.render()
+    glFinish()
+
+    for frame in range(frames):
+        inputs.apply(game.sim, frame)
+        game.update(FRAME_DELTA_TIME)
+
+        start = time.perf_counter()
+        game.render()
+        glFinish()
+        frame_times[frame] = time.perf_counter() - start
+
+    frame_ms = frame_times * 1000.0
+    return {
+        "frames": frames,
+        "mean_ms": float(frame_ms.mean()),
+        "p50_ms": float(np.percentile(frame_ms, 50)),
+        "p95_ms": float(np.percentile(frame_ms, 95)),
+        "p99_ms": float(np.percentile(frame_ms, 99)),
+        "fps": float(frames / frame_times.sum()),
+    }
@@ -0,0 +1,35 @@
+import time
+
+import numpy as np
+from OpenGL.GL import *
+
+from core.replay import load_session
+
+
+def bench_replay(game, path: str) -> dict:
+    # sessao gravada com `python src/main.py --record`, reproduzida o mais
+    # rapido possivel; cada frame (update + render ate o glFinish) e medido
+    session = load_session(path)
+    game.begin_replay(session)
+    frame_times = np.empty(len(session))
+
+    for frame, (delta_time, actions) in enumerate(session.frames):
+        start = time.perf_counter()
+        game.run_frame(delta_time, actions)
+        glFinish()
+        frame_times[frame] = time.perf_counter() - start
+    game.replaying = False
+
+    frame_ms = frame_times * 1000.0
+    sim = game.sim
+    return {
+        "frames": len(session),
+        "mean_ms": float(frame_ms.mean()),
+        "p50_ms": float(np.percentile(frame_ms, 50)),
+        "p95_ms": float(np.percentile(frame_ms, 95)),
+        "p99_ms": float(np.percentile(frame_ms, 99)),
+        "fps": float(len(session) / frame_times.sum()),
+        # igual em toda execucao da mesma sessao
+        "checksum": [sim.player.coins, sim.is_game_over, len(sim.obstacles),
+                     len(sim.coins), round(float(sim.player.position.x), 4)],
+    }
@@ -0,0 +1,195 @@
+import argparse
+import json
+import os
+import platform
+import sys
+
+import numpy as np
+import OpenGL
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "src"))
+
+from offscreen import create_context, select_backend
+from scenes import ENTITY_COUNTS
+from sim_bench import bench_simulation
+
+# metricas comparadas com o baseline (maior = pior), quando o resultado as tem;
+# todas sao a mediana entre as repeticoes (o p95 de uma execucao oscila demais)
+COMPARED_METRICS = ("mean_ms", "p50_ms", "time_to_first_frame_ms")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Benchmarks deterministicos da simulacao e do render")
+    parser.add_argument("--counts", type=int, nargs="+", default=list(ENTITY_COUNTS),
+                        help="quantidades de obstaculos/moedas por cena")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--seconds", type=float, default=5.0,
+                        help="segundos simulados por cena")
+    parser.add_argument("--frames", type=int, default=120,
+                        help="frames renderizados por cena")
+    parser.add_argument("--width", type=int, default=800)
+    parser.add_argument("--height", type=int, default=600)
+    parser.add_argument("--no-render", action="store_true",
+                        help="roda apenas os benchmarks da simulacao")
+    parser.add_argument("--backend", choices=("auto", "egl", "glfw"), default="auto",
+                        help="contexto offscreen do render (auto: glfw com DISPLAY, senao egl)")
+    parser.add_argument("--replay", nargs="+", default=[], metavar="ARQUIVO",
+                        help="sessoes gravadas (main.py --record) medidas frame a frame")
+    parser.add_argument("--output", help="arquivo JSON com os resultados")
+    parser.add_argument("--baseline", help="JSON de referencia para comparar")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="grava os resultados em --baseline em vez de comparar")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="execucoes de cada cena; os tempos sao a mediana entre elas")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="piora relativa aceita antes de acusar regressao")
+    parser.add_argument("--min-delta", type=float, default=0.05,
+                        help="piora absoluta (ms) sempre aceita, para metricas muito pequenas")
+    return parser.parse_args()
+
+
+def median_of_runs(run, repeats: int) -> dict:
+    # roda a cena varias vezes: os tempos viram a mediana entre as execucoes e
+    # o resto (checksum, quantidade de frames) vem da primeira
+    runs = [run() for _ in range(max(1, repeats))]
+    result = dict(runs[0])
+    for key in result:
+        if key.endswith("_ms") or key in ("fps", "steps_per_s"):
+            result[key] = float(np.median([run_result[key] for run_result in runs]))
+    result["runs"] = len(runs)
+    return result
+
+
+def run_benchmarks(args) -> dict:
+    results = {}
+    meta = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "seed": args.seed,
+        "seconds": args.seconds,
+        "frames": args.frames,
+        "repeat": args.repeat,
+    }
+
+    for count in args.counts:
+        result = median_of_runs(
+            lambda: bench_simulation(count, args.seed, args.seconds), args.repeat)
+        results[f"sim/{count}"] = result
+        print(f"sim/{count}: {result['mean_ms']:.3f} ms/passo "
+              f"(p95 {result['p95_ms']:.3f})")
+
+    if not args.no_render:
+        # o contexto EGL importa OpenGL.EGL antes de tudo (o modulo EGL nao
+        # carrega com a checagem desligada); a flag so vale para o OpenGL.GL
+        # importado depois. como o EGL ja leu as flags do PyOpenGL, a copia em
+        # _configflags tambem e trocada
+        destroy_context = create_context(args.backend, args.width, args.height)
+        OpenGL.ERROR_CHECKING = False
+        from OpenGL import _configflags
+        _configflags.ERROR_CHECKING = False
+        # mesmo modo do jogo em release (sem glGetError a cada chamada)
+        meta["gl_error_checking"] = False
+        try:
+            from render_bench import bench_render, create_game, gl_info
+
+            meta["gl"] = gl_info()
+            games = []
+
+            def start_game():
+                game, startup = create_game(args.width, args.height)
+                games.append(game)
+                return startup
+
+            results["startup"] = startup = median_of_runs(start_game, args.repeat)
+            # so o ultimo jogo criado segue para as outras cenas
+            game = games.pop()
+            for old_game in games:
+                old_game.cleanup()
+            print(f"startup: primeiro frame em {startup['time_to_first_frame_ms']:.1f} ms "
+                  f"(todos os assets em {startup['all_assets_ms']:.1f} ms)")
+            for count in args.counts:
+                result = median_of_runs(
+                    lambda: bench_render(game, count, args.seed, args.frames), args.repeat)
+                results[f"render/{count}"] = result
+                print(f"render/{count}: {result['mean_ms']:.3f} ms/frame "
+                      f"(p95 {result['p95_ms']:.3f})")
+
+            from replay_bench import bench_replay
+
+            for path in args.replay:
+                name = f"replay/{os.path.basename(path)}"
+                result = median_of_runs(lambda: bench_replay(game, path), args.repeat)
+                results[name] = result
+                print(f"{name}: {result['mean_ms']:.3f} ms/frame "
+                      f"(p95 {result['p95_ms']:.3f}, {result['frames']} frames)")
+            game.cleanup()
+        finally:
+            destroy_context()
+
+    return {"meta": meta, "results": results}
+
+
+def compare(current: dict, baseline: dict, tolerance: float, min_delta: float) -> bool:
+    # devolve False se alguma metrica piorou mais que a tolerancia relativa e
+    # tambem mais que min_delta ms (metricas de centesimos de ms so oscilam)
+    ok = True
+    base_results = baseline["results"]
+
+    for name, result in current["results"].items():
+        base = base_results.get(name)
+        if base is None:
+            print(f"{name}: sem baseline")
+            continue
+
+        for metric in COMPARED_METRICS:
+            if metric not in result or metric not in base:
+                continue
+            ratio = result[metric] / base[metric] if base[metric] else 1.0
+            allowed = max(base[metric] * tolerance, min_delta)
+            status = "ok"
+            if result[metric] - base[metric] > allowed:
+                status = "REGRESSAO"
+                ok = False
+            print(f"{name} {metric}: {base[metric]:.3f} -> {result[metric]:.3f} ms "
+                  f"({(ratio - 1.0) * 100.0:+.1f}%) {status}")
+
+        if "checksum" in base and base["checksum"] != result["checksum"]:
+            print(f"{name}: aviso, o resultado da simulacao mudou "
+                  f"({base['checksum']} -> {result['checksum']})")
+
+    return ok
+
+
+def main():
+    args = parse_args()
+    args.backend = select_backend(args.backend)
+    for name in ("output", "baseline"):
+        if getattr(args, name):
+            setattr(args, name, os.path.abspath(getattr(args, name)))
+    args.replay = [os.path.abspath(path) for path in args.replay]
+    # os caminhos dos assets sao relativos a raiz do repositorio
+    os.chdir(REPO_ROOT)
+
+    report = run_benchmarks(args)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline and args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"baseline salvo em {args.baseline}")
+    elif args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if not compare(report, baseline, args.tolerance, args.min_delta):
+            print("benchmark: regressao de desempenho")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import random
+
+from core import constants as const
+from simulation import Simulation
+
+ENTITY_COUNTS = (10, 100, 1000, 10000)
+
+
+class BenchSimulation(Simulation):
+    # colisoes continuam sendo testadas, mas o jogo nunca termina
+    def __init__(self, *args, **kwargs):
+        self.hits = 0
+        super().__init__(*args, **kwargs)
+
+    def trigger_game_over(self):
+        self.hits += 1
+
+
+def build_scene(count: int, seed: int, seconds: float) -> BenchSimulation:
+    # count obstaculos e count moedas espalhados pelas pistas; as moedas
+    # comecam atras do ponto de criacao para continuarem chegando durante
+    # todo o benchmark
+    sim = BenchSimulation(seed=seed)
+    rng = sim.rng
+
+    sim.obstacles.clear()
+    for _ in range(count):
+        sim.obstacles.spawn(
+            rng.choice(const.LANE_POSITIONS),
+            rng.uniform(const.CREATE_Z, const.Z_NEAR - 40.0),
+            const.OBSTACLE_WIDTH,
+            rng.uniform(const.OBSTACLE_MIN_HEIGHT, const.OBSTACLE_MAX_HEIGHT),
+            rng.uniform(const.OBSTACLE_MIN_DEPTH, const.OBSTACLE_MAX_DEPTH))
+
+    far_z = const.CREATE_Z - const.MAX_SPEED * seconds
+    sim.coins.clear()
+    for _ in range(count):
+        sim.coins.spawn(rng.choice(const.LANE_POSITIONS),
+                        rng.uniform(far_z, const.PLAYER_Z - 10.0))
+
+    sim.magnets.clear()
+    for _ in range(max(1, count // 10)):
+        sim.magnets.spawn(rng.choice(const.LANE_POSITIONS),
+                          rng.uniform(far_z, const.PLAYER_Z - 10.0))
+
+    # ima sempre ativo para exercitar a atracao das moedas
+    sim.player.magnet_timer = seconds + 1.0
+    return sim
+
+
+class InputScript:
+    # entradas pseudo-aleatorias, iguais em toda execucao com o mesmo seed
+    def __init__(self, seed: int, interval: int = 40):
+        self.rng = random.Random(seed)
+        self.interval = interval
+
+    def apply(self, sim, step: int):
+        if step % self.interval:
+            return
+
+        roll = self.rng.random()
+        if roll < 0.3:
+            sim.move_left()
+        elif roll < 0.6:
+            sim.move_right()
+        elif roll < 0.8:
+            sim.jump()
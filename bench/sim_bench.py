@@ -0,0 +1,32 @@
+import time
+
+import numpy as np
+
+from scenes import InputScript, build_scene
+
+
+def bench_simulation(count: int, seed: int, seconds: float) -> dict:
+    sim = build_scene(count, seed, seconds)
+    inputs = InputScript(seed + 1)
+    steps = int(round(seconds / sim.delta_time))
+    step_times = np.empty(steps)
+
+    for step in range(steps):
+        inputs.apply(sim, step)
+        start = time.perf_counter()
+        sim.step()
+        step_times[step] = time.perf_counter() - start
+        sim.poll_events()
+
+    step_ms = step_times * 1000.0
+    return {
+        "steps": steps,
+        "mean_ms": float(step_ms.mean()),
+        "p50_ms": float(np.percentile(step_ms, 50)),
+        "p95_ms": float(np.percentile(step_ms, 95)),
+        "p99_ms": float(np.percentile(step_ms, 99)),
+        "steps_per_s": float(steps / step_times.sum()),
+        # muda se o comportamento da simulacao mudar
+        "checksum": [sim.player.coins, sim.hits, len(sim.obstacles),
+                     len(sim.coins), round(float(sim.player.position.x), 4)],
+    }
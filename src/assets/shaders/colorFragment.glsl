@@ -5,28 +5,13 @@ in vec3 ourColor;
 in vec3 FragPos;
 in vec3 Normal;
 
-uniform vec3 lightPos;
-uniform vec3 lightColor;
-uniform vec3 viewPos;
+// cor extra multiplicada na luz (contorno do player)
+uniform vec3 tint;
+
+#include "lighting.glsl"
 
 void main()
 {
-    vec3 norm = normalize(Normal);
-    vec3 lightDir = normalize(lightPos - FragPos);
-    vec3 viewDir  = normalize(viewPos - FragPos);
-
-    // ambient
-    vec3 ambient = 0.3 * lightColor;
-
-    // diffuse
-    float diff = max(dot(norm, lightDir), 0.0);
-    vec3 diffuse = diff * lightColor;
-
-    // specular
-    vec3 reflectDir = reflect(-lightDir, norm);
-    float spec = pow(max(dot(viewDir, reflectDir), 0.0), 32.0);
-    vec3 specular = 0.5 * spec * lightColor;
-
-    vec3 result = (ambient + diffuse + specular) * ourColor;
+    vec3 result = phong(lightColor.rgb * tint, Normal, FragPos) * ourColor;
     FragColor = vec4(result, 1.0);
 }
@@ -7,14 +7,13 @@ out vec3 ourColor;
 out vec3 FragPos;
 out vec3 Normal;
 
-uniform mat4 model;
-uniform mat4 view;
-uniform mat4 projection;
+#include "model.glsl"
+#include "frame.glsl"
 
 void main()
 {
-    FragPos = vec3(model * vec4(a_pos, 1.0));
-    Normal  = mat3(transpose(inverse(model))) * a_normal;
+    FragPos = vec3(MODEL_MATRIX * vec4(a_pos, 1.0)) + MODEL_OFFSET;
+    Normal  = NORMAL_MATRIX * a_normal;
 
     gl_Position = projection * view * vec4(FragPos, 1.0);
     ourColor = a_color;
@@ -2,31 +2,18 @@
 out vec4 FragColor;
 
 in vec2 TexCoord;
+flat in float TexLayer;
 in vec3 FragPos;
 in vec3 Normal;
 
-uniform sampler2D texture1;
-uniform vec3 lightPos;
-uniform vec3 lightColor;
-uniform vec3 viewPos;
+uniform sampler2DArray textures;
+
+#include "lighting.glsl"
 
 void main()
 {
-    vec3 texColor = texture(texture1, TexCoord).rgb;
-
-    vec3 norm = normalize(Normal);
-    vec3 lightDir = normalize(lightPos - FragPos);
-    vec3 viewDir  = normalize(viewPos - FragPos);
-
-    vec3 ambient = 0.3 * lightColor;
-
-    float diff = max(dot(norm, lightDir), 0.0);
-    vec3 diffuse = diff * lightColor;
-
-    vec3 reflectDir = reflect(-lightDir, norm);
-    float spec = pow(max(dot(viewDir, reflectDir), 0.0), 32.0);
-    vec3 specular = 0.5 * spec * lightColor;
+    vec3 texColor = texture(textures, vec3(TexCoord, TexLayer)).rgb;
 
-    vec3 result = (ambient + diffuse + specular) * texColor;
+    vec3 result = phong(lightColor.rgb, Normal, FragPos) * texColor;
     FragColor = vec4(result, 1.0);
 }
@@ -0,0 +1,9 @@
+// camera e luz, atualizadas uma vez por frame (FrameUniformBuffer)
+layout (std140) uniform Frame
+{
+    mat4 view;
+    mat4 projection;
+    vec4 lightPos;
+    vec4 lightColor;
+    vec4 viewPos;
+};
@@ -0,0 +1,23 @@
+#include "frame.glsl"
+
+// phong: ambiente + difusa + especular de uma luz pontual com a cor light
+vec3 phong(vec3 light, vec3 normal, vec3 fragPos)
+{
+    vec3 norm = normalize(normal);
+    vec3 lightDir = normalize(lightPos.xyz - fragPos);
+    vec3 viewDir  = normalize(viewPos.xyz - fragPos);
+
+    // ambient
+    vec3 ambient = 0.3 * light;
+
+    // diffuse
+    float diff = max(dot(norm, lightDir), 0.0);
+    vec3 diffuse = diff * light;
+
+    // specular
+    vec3 reflectDir = reflect(-lightDir, norm);
+    float spec = pow(max(dot(viewDir, reflectDir), 0.0), 32.0);
+    vec3 specular = 0.5 * spec * light;
+
+    return ambient + diffuse + specular;
+}
@@ -0,0 +1,21 @@
+// matriz model e matriz normal: por objeto (uniforms) ou, com INSTANCED,
+// por instancia (atributos vindos do InstanceBuffer)
+#ifdef INSTANCED
+layout (location = 3) in mat4 a_model;
+layout (location = 8) in mat3 a_normalMatrix;
+
+// deslocamento comum a todas as instancias (interpolacao entre passos da simulacao)
+uniform vec3 instanceOffset;
+
+#define MODEL_MATRIX a_model
+#define NORMAL_MATRIX a_normalMatrix
+#define MODEL_OFFSET instanceOffset
+#else
+uniform mat4 model;
+// transpose(inverse(mat3(model))), calculada na CPU uma vez por objeto
+uniform mat3 normalMatrix;
+
+#define MODEL_MATRIX model
+#define NORMAL_MATRIX normalMatrix
+#define MODEL_OFFSET vec3(0.0)
+#endif
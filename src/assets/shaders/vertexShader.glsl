@@ -2,22 +2,25 @@
 layout (location = 0) in vec3 a_pos;
 layout (location = 1) in vec2 a_texCoord;
 layout (location = 2) in vec3 a_normal;
+layout (location = 7) in float a_layer;
 
 out vec2 TexCoord;
+flat out float TexLayer;
 out vec3 FragPos;
 out vec3 Normal;
 
-uniform mat4 model;
-uniform mat4 view;
-uniform mat4 projection;
+#include "model.glsl"
+#include "frame.glsl"
+
 uniform vec2 uvOffset; 
 
 void main()
 {
-    FragPos = vec3(model * vec4(a_pos, 1.0));
-    Normal  = mat3(transpose(inverse(model))) * a_normal;
+    FragPos = vec3(MODEL_MATRIX * vec4(a_pos, 1.0)) + MODEL_OFFSET;
+    Normal  = NORMAL_MATRIX * a_normal;
 
     TexCoord = a_texCoord + uvOffset;
+    TexLayer = a_layer;
     
     gl_Position = projection * view * vec4(FragPos, 1.0);
-}
\ No newline at end of file
+}
@@ -0,0 +1,31 @@
+import glob
+import time
+
+from core import bake_obj
+from core import constants as const
+from graphics.texture_loader import bake_texture
+
+
+# gera os caches binarios dos assets antes de rodar o jogo
+def bake_models():
+    for path in sorted(glob.glob("src/assets/models/**/*.obj", recursive=True)):
+        start = time.perf_counter()
+        vertices, indices = bake_obj(path)
+        elapsed = (time.perf_counter() - start) * 1000.0
+        print(f"{path}: {len(vertices)} vertices, {len(indices)} indices "
+              f"({elapsed:.1f} ms)")
+
+
+def bake_textures():
+    for path in sorted(glob.glob("src/assets/textures/**/*.*", recursive=True)):
+        start = time.perf_counter()
+        # no tamanho usado pelas camadas da textura array
+        width, height, levels = bake_texture(path, const.TEXTURE_LAYER_SIZE)
+        elapsed = (time.perf_counter() - start) * 1000.0
+        print(f"{path}: {width}x{height}, {len(levels)} mip levels "
+              f"({elapsed:.1f} ms)")
+
+
+if __name__ == "__main__":
+    bake_models()
+    bake_textures()
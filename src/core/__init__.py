@@ -1,4 +1,6 @@
 from .constants import *
 from . import constants
-from .mesh import Mesh
-from .model_loader import load_obj
+from .model_loader import load_obj, load_mesh, bake_obj, index_vertices
+from .profiler import Profiler, profiler
+from .replay import Session, SessionRecorder, load_session
+from .asset_manager import AssetManager
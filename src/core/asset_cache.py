@@ -0,0 +1,30 @@
+import os
+
+from . import constants as const
+
+
+def cache_path(kind: str, name: str, source_path: str = None) -> str:
+    # <ASSET_CACHE_DIR>/<kind>/<pasta do arquivo de origem>/<name>; sem
+    # source_path o cache fica direto em <kind>
+    if source_path is None:
+        return os.path.join(const.ASSET_CACHE_DIR, kind, name)
+    folder = os.path.basename(os.path.dirname(source_path))
+    return os.path.join(const.ASSET_CACHE_DIR, kind, folder, name)
+
+
+def source_stamp(source_path: str):
+    # (mtime em ns, tamanho) do arquivo de origem, gravados no cabecalho do
+    # cache: se um dos dois mudar o cache e refeito
+    source = os.stat(source_path)
+    return source.st_mtime_ns, source.st_size
+
+
+def write_cache(path: str, *chunks):
+    # escreve em arquivo temporario e troca de uma vez, para nunca deixar um
+    # cache pela metade
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        for chunk in chunks:
+            f.write(chunk)
+    os.replace(tmp_path, path)
@@ -0,0 +1,79 @@
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+ASSET_LOAD_WORKERS = min(8, os.cpu_count() or 1)
+
+
+def read_bytes(path: str) -> bytes:
+    # so a leitura do disco; quem nao pode rodar fora da thread principal
+    # (ex.: pygame.mixer.music) decodifica no on_ready
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+class AssetManager:
+    # leitura do disco e decodificacao rodam em threads; o que usa o contexto
+    # GL (on_ready) roda em poll(), sempre na thread principal.
+    # os pedidos sao atendidos na ordem em que chegam: os criticos vao primeiro.
+    # um asset critico que falha interrompe o carregamento; os outros ficam em
+    # failed e o jogo segue sem eles
+    def __init__(self, workers: int = ASSET_LOAD_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=workers,
+                                            thread_name_prefix="assets")
+        self._pending = {}
+        self._critical = set()
+        self.loaded = set()
+        self.failed = {}
+        self.total = 0
+        # ms entre o pedido e o asset ficar pronto, por nome
+        self.timings = {}
+
+    def load(self, name: str, loader, *args, on_ready=None, critical=False):
+        future = self._executor.submit(loader, *args)
+        self._pending[future] = (name, on_ready, time.perf_counter())
+        if critical:
+            self._critical.add(name)
+        self.total += 1
+
+    def poll(self, timeout: float = 0.0) -> int:
+        # finaliza os assets ja decodificados; timeout=None espera pelo menos um
+        if not self._pending:
+            return 0
+
+        done, _ = wait(self._pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            name, on_ready, start = self._pending.pop(future)
+            try:
+                result = future.result()
+                if on_ready is not None:
+                    on_ready(result)
+            except Exception as error:
+                if name in self._critical:
+                    raise
+                self.failed[name] = error
+                print(f"asset {name} nao carregou ({error}); seguindo sem ele")
+            else:
+                self.loaded.add(name)
+            self._critical.discard(name)
+            self.timings[name] = (time.perf_counter() - start) * 1000.0
+        return len(done)
+
+    def wait(self, critical_only: bool = False):
+        while not self.finished(critical_only):
+            self.poll(timeout=None)
+
+    def finished(self, critical_only: bool = False) -> bool:
+        return not (self._critical if critical_only else self._pending)
+
+    def is_ready(self, *names) -> bool:
+        return all(name in self.loaded for name in names)
+
+    @property
+    def progress(self) -> float:
+        done = len(self.loaded) + len(self.failed)
+        return done / self.total if self.total else 1.0
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._pending.clear()
@@ -1,5 +1,17 @@
 WIDTH, HEIGHT = 800, 600
 
+# profiler: resumo no console a cada segundo e trace do chrome ao sair
+# (F3 liga/desliga durante o jogo)
+PROFILE = False
+PROFILE_TRACE_PATH = "profile_trace.json"
+
+# checagem de erro do PyOpenGL (glGetError depois de cada chamada): desligada
+# no jogo normal, ligada com `python src/main.py --gl-debug`
+GL_ERROR_CHECKING = False
+
+# caches gerados a partir dos assets (ignorados pelo git)
+ASSET_CACHE_DIR = "src/assets/cache"
+
 # fisica e moviemnto
 SPEED_INCREMENT = 0.5   # aceleracaoo por segundo
 MAX_SPEED = 50.0
@@ -7,6 +19,10 @@ OBSTACLE_SPEED = 15.0   # velocidade do cenário
 GRAVITY = -40.0
 JUMP_STRENGTH = 15.0
 STRAFE_SPEED = 10.0
+FIXED_DELTA_TIME = 1.0 / 120.0  # passo fixo da simulacao
+SIM_THREAD = True               # simulacao em thread propria (o render interpola)
+MAX_STEPS_PER_FRAME = 8         # passos por frame; o atraso alem disso e descartado
+PHYSICS_SUBSTEPS = 1            # subpassos de cada passo fixo
 
 # spawn e profundidade
 Z_NEAR = 0.0            # Inicio da renderizacaoo da pista
@@ -32,6 +48,7 @@ COIN_GAP = 2.0
 GROUP_MIN_SIZE = 3
 GROUP_MAX_SIZE = 10
 GROUP_DISTANCE = 40.0
+MAX_COINS = 100         # limite de moedas ativas ao mesmo tempo
 
 # ima
 MAGNET_DURATION = 10.0
@@ -44,6 +61,10 @@ LANE_WIDTH = 2.0
 GAP = 0.1
 LANE_LENGTH = 200.0
 TEXTURE_REPEATS = 20.0
+TEXTURE_LAYER_SIZE = 1024   # lado de cada camada da textura array
+
+# LOD: alem deste z as moedas viram um quad e os obstaculos perdem as pernas
+LOD_Z = -100.0
 
 # pista central
 C_X1 = -LANE_WIDTH * 0.5
@@ -252,6 +273,9 @@ COIN_VERTICES = [
     [-0.25,  0.25, -0.25,  0,  1,  0,  0.0, 1.0],
 ]
 
+# LOD da moeda: so a face de tras (+z), a que fica de frente para a camera
+COIN_IMPOSTOR_VERTICES = COIN_VERTICES[6:12]
+
 MAGNET_VERTICES = [
     [-0.4, 0.2, 0.1,  0, 0, 1,  0.9, 0.9, 0.9],
     [-0.2, 0.2, 0.1,  0, 0, 1,  0.9, 0.9, 0.9],
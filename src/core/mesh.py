@@ -2,12 +2,83 @@ from OpenGL.GL import *
 import ctypes
 import numpy as np
 
+from .model_loader import index_vertices
+from .stream_buffer import StreamBuffer
+
+INSTANCE_MATRIX_LOCATION = 3
+TEXTURE_LAYER_LOCATION = 7
+INSTANCE_NORMAL_LOCATION = 8
+# por instancia: matriz model (4x4) seguida da matriz normal (3x3)
+INSTANCE_FLOATS = 16 + 9
+INDEX_GL_TYPES = {2: GL_UNSIGNED_SHORT, 4: GL_UNSIGNED_INT}
+
+
+class InstanceBuffer:
+    # dados por instancia compartilhados entre meshes, escritos em um
+    # StreamBuffer (em anel, sem esperar a GPU terminar o frame anterior)
+    def __init__(self):
+        self.stream = StreamBuffer(INSTANCE_FLOATS)
+        self.meshes = []
+
+    @property
+    def vbo(self):
+        return self.stream.buffer
+
+    @property
+    def count(self):
+        return self.stream.count
+
+    @property
+    def first(self):
+        # instancia inicial da ultima escrita (regiao atual do anel)
+        return self.stream.first
+
+    def update(self, instances, mask=None):
+        # instances: array (n, INSTANCE_FLOATS), matrizes em ordem de coluna;
+        # com mask so as linhas marcadas vao para o buffer, copiadas direto
+        # para a memoria mapeada
+        count = len(instances) if mask is None else int(np.count_nonzero(mask))
+        vbo = self.stream.buffer
+        data = self.stream.write(count)
+        if mask is None:
+            data[:] = instances
+        else:
+            np.compress(mask, instances, axis=0, out=data)
+        self.stream.commit()
+
+        if self.stream.buffer != vbo:
+            # o buffer cresceu: os VAOs passam a apontar para o novo
+            for mesh in self.meshes:
+                mesh.bind_instance_attributes()
+
+    def cleanup(self):
+        self.stream.cleanup()
+
+
 class Mesh:
-    def __init__(self, vertices_data, vertices_count, has_texture=False):
+    @classmethod
+    def indexed(cls, vertices_data, has_texture=False, layer=None):
+        # deduplica os vertices de uma lista expandida (ex.: constants.py)
+        floats_per_vertex = 8 if has_texture else 9
+        vertices, indices = index_vertices(vertices_data, floats_per_vertex)
+        return cls(vertices, len(vertices), has_texture=has_texture,
+                   indices=indices, layer=layer)
+
+    def __init__(self, vertices_data, vertices_count, has_texture=False, indices=None, layer=None):
         self.FLOAT_BYTE_SIZE = 4
 
         self.vertices_count = vertices_count
-        vertices = np.array(vertices_data, dtype=np.float32)
+        self.instance_buffer = None
+        self.ebo = None
+        vertices = np.asarray(vertices_data, dtype=np.float32)
+
+        # camada da textura array gravada em cada vertice
+        has_layer = has_texture and layer is not None
+        if has_layer:
+            vertices = vertices.reshape(-1, 8)
+            layers = np.broadcast_to(
+                np.asarray(layer, dtype=np.float32), (len(vertices),))
+            vertices = np.column_stack([vertices, layers])
 
         self.vao = glGenVertexArrays(1)
         self.vbo = glGenBuffers(1)
@@ -21,14 +92,35 @@ class Mesh:
             GL_STATIC_DRAW
         )
 
-        self._configure_attributes(has_texture)
-        
+        self._configure_attributes(has_texture, has_layer)
+
+        if indices is not None:
+            self._configure_indices(indices)
+
         glBindBuffer(GL_ARRAY_BUFFER, 0)
         glBindVertexArray(0)
 
-    def _configure_attributes(self, has_texture):
+    def _configure_indices(self, indices_data):
+        # o EBO fica registrado no VAO, por isso nao e desligado aqui
+        indices = np.asarray(indices_data)
+        if indices.dtype not in (np.uint16, np.uint32):
+            indices = indices.astype(np.uint32)
+
+        self.index_count = len(indices)
+        self.index_type = INDEX_GL_TYPES[indices.itemsize]
+
+        self.ebo = glGenBuffers(1)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.ebo)
+        glBufferData(
+            GL_ELEMENT_ARRAY_BUFFER,
+            indices.nbytes,
+            indices,
+            GL_STATIC_DRAW
+        )
+
+    def _configure_attributes(self, has_texture, has_layer=False):
         if has_texture:
-            stride = 8 * self.FLOAT_BYTE_SIZE
+            stride = (9 if has_layer else 8) * self.FLOAT_BYTE_SIZE
             attr_config = {"size": 2, "index": 1}
         else:
             stride = 9 * self.FLOAT_BYTE_SIZE
@@ -45,6 +137,10 @@ class Mesh:
             6 * self.FLOAT_BYTE_SIZE
         )
 
+        if has_layer:
+            self._enable_attribute(
+                TEXTURE_LAYER_LOCATION, 1, stride, 8 * self.FLOAT_BYTE_SIZE)
+
     def _enable_attribute(self, location, size, stride, offset):
         glVertexAttribPointer(
             location, size, GL_FLOAT, GL_FALSE,
@@ -52,13 +148,66 @@ class Mesh:
         )
         glEnableVertexAttribArray(location)
 
-    def draw(self):
+    def attach_instances(self, instance_buffer):
+        self.instance_buffer = instance_buffer
+        instance_buffer.meshes.append(self)
+        self.bind_instance_attributes()
+
+    def bind_instance_attributes(self):
+        # liga o buffer de instancias ao VAO (mat4 ocupa 4 locations e mat3, 3)
+        stride = INSTANCE_FLOATS * self.FLOAT_BYTE_SIZE
+
         glBindVertexArray(self.vao)
-        glDrawArrays(GL_TRIANGLES, 0, self.vertices_count)
+        glBindBuffer(GL_ARRAY_BUFFER, self.instance_buffer.vbo)
+        for column in range(4):
+            location = INSTANCE_MATRIX_LOCATION + column
+            self._enable_attribute(
+                location, 4, stride, column * 4 * self.FLOAT_BYTE_SIZE)
+            glVertexAttribDivisor(location, 1)
+        for column in range(3):
+            location = INSTANCE_NORMAL_LOCATION + column
+            self._enable_attribute(
+                location, 3, stride, (16 + column * 3) * self.FLOAT_BYTE_SIZE)
+            glVertexAttribDivisor(location, 1)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
         glBindVertexArray(0)
 
+    # issue_*: so a chamada de desenho, com o VAO ja ligado (RenderQueue);
+    # first_index/index_count desenham parte do EBO (lotes estaticos)
+    def issue_draw(self, first_index=0, index_count=None):
+        if self.ebo is None:
+            glDrawArrays(GL_TRIANGLES, 0, self.vertices_count)
+            return
+
+        if index_count is None:
+            index_count = self.index_count
+        offset = first_index * (2 if self.index_type == GL_UNSIGNED_SHORT else 4)
+        glDrawElements(GL_TRIANGLES, index_count, self.index_type,
+                       ctypes.c_void_p(offset))
+
+    def issue_draw_instanced(self, count=None):
+        # count: so as primeiras instancias do buffer (None = todas);
+        # first != 0 so no anel do buffer persistente (base instance disponivel)
+        if count is None:
+            count = self.instance_buffer.count
+        first = self.instance_buffer.first
+        if self.ebo is not None:
+            if first:
+                glDrawElementsInstancedBaseInstance(GL_TRIANGLES, self.index_count,
+                                                    self.index_type, None, count, first)
+            else:
+                glDrawElementsInstanced(GL_TRIANGLES, self.index_count,
+                                        self.index_type, None, count)
+        elif first:
+            glDrawArraysInstancedBaseInstance(GL_TRIANGLES, 0, self.vertices_count,
+                                              count, first)
+        else:
+            glDrawArraysInstanced(GL_TRIANGLES, 0, self.vertices_count, count)
+
     def cleanup(self):
         if hasattr(self, 'vao'):
             glDeleteVertexArrays(1, [self.vao])
         if hasattr(self, 'vbo'):
             glDeleteBuffers(1, [self.vbo])
+        if self.ebo is not None:
+            glDeleteBuffers(1, [self.ebo])
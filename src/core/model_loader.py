@@ -1,55 +1,281 @@
-def load_obj(filename: str) -> list[float]:
-    # le um arquivo .obj e retorna uma lista plana de floats
-    raw_vertices = []
-    raw_uvs = []
-    raw_normals = []
-    final_buffer = []
+import itertools
+import os
+import re
+import struct
+from operator import methodcaller
+
+import numpy as np
+
+from . import asset_cache
+
+# cabecalho: magic, versao, mtime e tamanho do .obj, quantidade de floats,
+# quantidade de indices e tamanho de cada indice em bytes
+MESH_CACHE_MAGIC = b"BRMESH"
+MESH_CACHE_VERSION = 3
+MESH_CACHE_HEADER = struct.Struct("<6sHQQQQI4x")
+INDEX_DTYPES = {2: np.uint16, 4: np.uint32}
+
+
+def load_mesh(filename: str):
+    # carrega o cache binario do .obj, recriando-o quando estiver desatualizado
+    mesh = _read_mesh_cache(_mesh_cache_path(filename), asset_cache.source_stamp(filename))
+    if mesh is None:
+        mesh = bake_obj(filename)
+    return mesh
+
+
+def bake_obj(filename: str):
+    vertices, indices = load_obj(filename)
+    header = MESH_CACHE_HEADER.pack(
+        MESH_CACHE_MAGIC, MESH_CACHE_VERSION, *asset_cache.source_stamp(filename),
+        vertices.size, indices.size, indices.itemsize)
+    asset_cache.write_cache(_mesh_cache_path(filename), header,
+                            vertices.tobytes(), indices.tobytes())
+
+    return vertices, indices
+
+
+def _mesh_cache_path(filename: str) -> str:
+    name = os.path.splitext(os.path.basename(filename))[0]
+    return asset_cache.cache_path("models", name + ".mesh", filename)
+
+
+def _read_mesh_cache(cache_path: str, stamp):
+    try:
+        with open(cache_path, 'rb') as f:
+            header = f.read(MESH_CACHE_HEADER.size)
+    except OSError:
+        return None
+
+    if len(header) != MESH_CACHE_HEADER.size:
+        return None
+
+    (magic, version, mtime_ns, size,
+     float_count, index_count, index_size) = MESH_CACHE_HEADER.unpack(header)
+    if (magic != MESH_CACHE_MAGIC or version != MESH_CACHE_VERSION or
+            (mtime_ns, size) != stamp or
+            index_size not in INDEX_DTYPES or float_count % 8 != 0):
+        return None
+
+    vertices_bytes = float_count * 4
+    expected_size = MESH_CACHE_HEADER.size + vertices_bytes + index_count * index_size
+    if os.path.getsize(cache_path) != expected_size or index_count == 0:
+        return None
+
+    vertices = np.memmap(cache_path, dtype=np.float32, mode='r',
+                         offset=MESH_CACHE_HEADER.size, shape=(float_count // 8, 8))
+    indices = np.memmap(cache_path, dtype=INDEX_DTYPES[index_size], mode='r',
+                        offset=MESH_CACHE_HEADER.size + vertices_bytes,
+                        shape=(index_count,))
+    return vertices, indices
+
+
+# quantos bytes de texto sao lidos por vez do .obj
+OBJ_BLOCK_BYTES = 1 << 20
+
+# cada bloco comeca com "\n", entao todo elemento fica no formato "\n<prefixo> "
+OBJ_VERTEX_RE = re.compile(r"\nv[ \t]([^\n]*)")
+OBJ_UV_RE = re.compile(r"\nvt[ \t]([^\n]*)")
+OBJ_NORMAL_RE = re.compile(r"\nvn[ \t]([^\n]*)")
+OBJ_FACE_RE = re.compile(r"\nf[ \t]([^\n]*)")
+OBJ_KIND_RE = re.compile(r"\n(vt|vn|v|f)[ \t]")
+
+
+def load_obj(filename: str):
+    # le um arquivo .obj e retorna os vertices unicos (x, y, z, nx, ny, nz, u, v)
+    # e a lista de indices dos triangulos
+    data = _ObjData()
 
     with open(filename, 'r') as f:
-        for line in f:
-            if line.startswith('#'):
-                continue
-
-            parts = line.split()
-            if not parts:
-                continue
-
-            prefix = parts[0]
-            data = parts[1:]
-
-            if prefix == 'v':
-                raw_vertices.append(list(map(float, data[:3])))
-            elif prefix == 'vt':
-                raw_uvs.append(list(map(float, data[:2])))
-            elif prefix == 'vn':
-                raw_normals.append(list(map(float, data[:3])))
-            elif prefix == 'f':
-                for face_vertex_str in data[:3]:
-                    _process_face_vertex(
-                        face_vertex_str,
-                        raw_vertices,
-                        raw_uvs,
-                        raw_normals,
-                        final_buffer
-                    )
-
-    return final_buffer
-
-
-def _process_face_vertex(vertex_str, vertices, uvs, normals, output_list):
-    components = vertex_str.split('/')
-
-    v_idx = int(components[0]) - 1
-    output_list.extend(vertices[v_idx])
-
-    if len(components) > 2 and components[2]:
-        n_idx = int(components[2]) - 1
-        output_list.extend(normals[n_idx])
-    else:
-        output_list.extend([0.0, 0.0, 0.0])
-
-    if len(components) > 1 and components[1]:
-        uv_idx = int(components[1]) - 1
-        output_list.extend(uvs[uv_idx])
-    else:
-        output_list.extend([0.0, 0.0])
+        while True:
+            # completa a ultima linha para o bloco nunca cortar um elemento
+            block = f.read(OBJ_BLOCK_BYTES)
+            if not block:
+                break
+            data.parse_block("\n" + block + f.readline())
+
+    return data.build(filename)
+
+
+class _ObjData:
+    # acumula os blocos ja convertidos para arrays NumPy
+    def __init__(self):
+        self.positions = []
+        self.uvs = []
+        self.normals = []
+        self.counts = [0, 0, 0]
+
+        self.corners = []
+        self.face_sizes = []
+        self.face_bases = []
+
+    def parse_block(self, text):
+        v_lines = OBJ_VERTEX_RE.findall(text)
+        vt_lines = OBJ_UV_RE.findall(text)
+        vn_lines = OBJ_NORMAL_RE.findall(text)
+        faces = list(map(str.split, OBJ_FACE_RE.findall(text)))
+        v_base, vt_base, vn_base = self.counts
+
+        self.positions.append(_parse_floats(v_lines, 3))
+        self.uvs.append(_parse_floats(vt_lines, 2))
+        self.normals.append(_parse_floats(vn_lines, 3))
+        self.counts = [v_base + len(v_lines), vt_base + len(vt_lines),
+                       vn_base + len(vn_lines)]
+
+        if not faces:
+            return
+
+        corners = list(itertools.chain.from_iterable(faces))
+        corners_text = " ".join(corners)
+        self.corners.append(_parse_corners(corners, corners_text))
+        self.face_sizes.append(np.fromiter(map(len, faces), dtype=np.int64,
+                                           count=len(faces)))
+
+        # indices negativos dependem de quantos v/vt/vn existiam antes da face
+        if '-' in corners_text:
+            kinds = np.array(OBJ_KIND_RE.findall(text))
+            is_face = kinds == 'f'
+            bases = np.stack([
+                np.cumsum(kinds == 'v')[is_face] + v_base,
+                np.cumsum(kinds == 'vt')[is_face] + vt_base,
+                np.cumsum(kinds == 'vn')[is_face] + vn_base,
+            ], axis=1)
+        else:
+            bases = np.zeros((len(faces), 3), dtype=np.int64)
+        self.face_bases.append(bases)
+
+    def build(self, filename):
+        positions = np.concatenate(self.positions)
+        uvs = np.concatenate(self.uvs)
+        normals = np.concatenate(self.normals)
+
+        if not self.corners:
+            return np.zeros((0, 8), dtype=np.float32), _index_array([], 0)
+
+        face_sizes = np.concatenate(self.face_sizes)
+        corner_bases = np.repeat(
+            np.concatenate(self.face_bases), face_sizes, axis=0)
+        corners = _resolve_indices(
+            np.concatenate(self.corners), corner_bases,
+            (len(positions), len(uvs), len(normals)), filename)
+
+        triangles = corners[_fan_triangulate(face_sizes)]
+
+        # cantos com o mesmo v/vt/vn reaproveitam o vertice
+        keys = ((triangles[:, 0] * (len(uvs) + 1) + triangles[:, 1]) *
+                (len(normals) + 1) + triangles[:, 2])
+        _, first, inverse = np.unique(
+            keys, return_index=True, return_inverse=True)
+        order = np.argsort(first)
+        remap = np.empty(len(order), dtype=np.int64)
+        remap[order] = np.arange(len(order))
+        unique = triangles[first[order]]
+
+        # indice -1 (componente ausente) cai na linha de zeros do final
+        uvs = np.vstack([uvs, np.zeros((1, 2), dtype=np.float32)])
+        normals = np.vstack([normals, np.zeros((1, 3), dtype=np.float32)])
+
+        vertices = np.hstack([
+            positions[unique[:, 0]],
+            normals[unique[:, 2]],
+            uvs[unique[:, 1]],
+        ])
+        return vertices, _index_array(remap[inverse.reshape(-1)], len(vertices))
+
+
+def _parse_floats(lines, columns: int) -> np.ndarray:
+    if not lines:
+        return np.zeros((0, columns), dtype=np.float32)
+
+    text = " ".join(lines)
+    if "\t" in text or "\r" in text or "  " in text or text.startswith(" "):
+        # espacos repetidos, tabs ou CRLF: normaliza para contar os valores
+        lines = [" ".join(line.split()) for line in lines]
+        text = " ".join(lines)
+
+    # o caminho em bloco so vale se todas as linhas tiverem a mesma quantidade
+    # de valores; so o total dividir pelo numero de linhas nao basta
+    spaces = set(map(methodcaller("count", " "), lines))
+    if len(spaces) == 1:
+        per_line = spaces.pop() + 1
+        values = np.fromstring(text, dtype=np.float32, sep=' ')
+        if per_line >= columns and values.size == len(lines) * per_line:
+            return values.reshape(len(lines), per_line)[:, :columns]
+
+    # linhas com quantidades diferentes de valores (ex.: v x y z r g b)
+    return np.array([line.split()[:columns] for line in lines], dtype=np.float32)
+
+
+def _parse_corners(corners, corners_text) -> np.ndarray:
+    # converte "v", "v/vt", "v//vn" e "v/vt/vn" em linhas (v, vt, vn); 0 = ausente.
+    # o caminho em bloco exige a mesma quantidade de barras em todos os cantos
+    slashes = set(map(methodcaller("count", "/"), corners))
+    if len(slashes) == 1:
+        columns = slashes.pop() + 1
+        text = corners_text.replace("//", "/0/").replace("/", " ")
+        values = np.fromstring(text, dtype=np.int64, sep=' ')
+        if columns <= 3 and values.size == len(corners) * columns:
+            result = np.zeros((len(corners), 3), dtype=np.int64)
+            result[:, :columns] = values.reshape(-1, columns)
+            return result
+
+    # formatos misturados no mesmo bloco
+    result = np.zeros((len(corners), 3), dtype=np.int64)
+    for i, corner in enumerate(corners):
+        for j, component in enumerate(corner.split('/')[:3]):
+            if component:
+                result[i, j] = int(component)
+    return result
+
+
+def _resolve_indices(corners, bases, sizes, filename) -> np.ndarray:
+    # indices positivos comecam em 1; negativos sao relativos ao que ja foi lido
+    resolved = np.where(corners > 0, corners - 1, bases + corners)
+    resolved[corners == 0] = -1
+
+    for column, size in enumerate(sizes):
+        values = resolved[:, column]
+        if column == 0:
+            invalid = (values < 0) | (values >= size)
+        else:
+            invalid = (values < -1) | (values >= size) | (
+                (corners[:, column] < 0) & (values < 0))
+        if np.any(invalid):
+            raise ValueError(f"{filename}: indice de face fora do intervalo")
+
+    return resolved
+
+
+def _fan_triangulate(face_sizes) -> np.ndarray:
+    # cada poligono de n cantos vira n - 2 triangulos (0, i, i + 1)
+    face_sizes = np.maximum(face_sizes, 0)
+    triangle_counts = np.maximum(face_sizes - 2, 0)
+    face_starts = np.concatenate([[0], np.cumsum(face_sizes)[:-1]])
+
+    triangle_face = np.repeat(np.arange(len(face_sizes)), triangle_counts)
+    first_triangle = np.concatenate([[0], np.cumsum(triangle_counts)[:-1]])
+    local = np.arange(len(triangle_face)) - first_triangle[triangle_face] + 1
+
+    start = face_starts[triangle_face]
+    return np.stack([start, start + local, start + local + 1], axis=1).reshape(-1)
+
+
+def index_vertices(vertices_data, floats_per_vertex: int = 8):
+    # converte uma lista de vertices expandidos (como as de constants.py)
+    # em vertices unicos + indices, mantendo a ordem da primeira ocorrencia
+    vertices = np.asarray(vertices_data, dtype=np.float32).reshape(
+        -1, floats_per_vertex)
+    unique, first, inverse = np.unique(
+        vertices, axis=0, return_index=True, return_inverse=True)
+
+    order = np.argsort(first)
+    remap = np.empty(len(order), dtype=np.int64)
+    remap[order] = np.arange(len(order))
+
+    return unique[order], _index_array(remap[inverse.reshape(-1)], len(unique))
+
+
+def _index_array(indices, vertex_count: int) -> np.ndarray:
+    # indices de 16 bits sempre que couberem
+    dtype = np.uint16 if vertex_count <= 0xFFFF else np.uint32
+    return np.asarray(indices, dtype=dtype)
@@ -0,0 +1,142 @@
+import json
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+
+import numpy as np
+
+_NO_SCOPE = nullcontext()
+
+
+class _Scope:
+    def __init__(self, profiler, name, gpu):
+        self.profiler = profiler
+        self.name = name
+        self.gpu_timer = profiler._gpu_timer(name) if gpu else None
+
+    def __enter__(self):
+        if self.gpu_timer:
+            self.gpu_timer.begin()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        if self.gpu_timer:
+            self.gpu_timer.end()
+            self.profiler._add_gpu(self.name, self.gpu_timer.elapsed_ms)
+        self.profiler._add_cpu(self.name, self.start, end)
+        return False
+
+
+class Profiler:
+    # escopos nomeados medidos com perf_counter; desligado, scope() nao mede nada.
+    # escopos com gpu=True tambem usam GL_TIME_ELAPSED (nao podem ser aninhados)
+    def __init__(self, enabled: bool = False, history: int = 600, max_events: int = 200_000):
+        self.enabled = enabled
+        self.gpu_timer_factory = None
+
+        self.origin = time.perf_counter()
+        self.events = deque(maxlen=max_events)
+        self.frame_times = deque(maxlen=history)
+        self.cpu_times = {}
+        self.gpu_times = {}
+        self.history = history
+
+        self._gpu_timers = {}
+        self._frame_start = None
+        self._frame_gpu = {}
+
+    def scope(self, name: str, gpu: bool = False):
+        if not self.enabled:
+            return _NO_SCOPE
+        return _Scope(self, name, gpu and self.gpu_timer_factory is not None)
+
+    def begin_frame(self):
+        if self.enabled:
+            self._frame_start = time.perf_counter()
+
+    def end_frame(self):
+        if not self.enabled or self._frame_start is None:
+            return
+
+        end = time.perf_counter()
+        self.frame_times.append((end - self._frame_start) * 1000.0)
+        self.events.append(("frame", self._frame_start, end, threading.get_native_id()))
+
+        if self._frame_gpu:
+            # tempos de GPU entram no trace como contador (so ha duracoes)
+            self.events.append(("gpu", end, dict(self._frame_gpu), 0))
+            self._frame_gpu.clear()
+
+        self._frame_start = None
+
+    def _gpu_timer(self, name):
+        timer = self._gpu_timers.get(name)
+        if timer is None:
+            timer = self._gpu_timers[name] = self.gpu_timer_factory()
+        return timer
+
+    def _add_cpu(self, name, start, end):
+        # escopos da thread da simulacao ficam em outra linha do trace
+        self.events.append((name, start, end, threading.get_native_id()))
+        self._history(self.cpu_times, name).append((end - start) * 1000.0)
+
+    def _add_gpu(self, name, elapsed_ms):
+        # o resultado da query e de alguns frames atras; None enquanto nao ha
+        if elapsed_ms is None:
+            return
+        self._frame_gpu[name] = elapsed_ms
+        self._history(self.gpu_times, name).append(elapsed_ms)
+
+    def _history(self, times, name):
+        history = times.get(name)
+        if history is None:
+            history = times[name] = deque(maxlen=self.history)
+        return history
+
+    def summary(self) -> str:
+        # p50/p95/p99 do frame e media de cada escopo nos ultimos frames
+        if not self.frame_times:
+            return "profiler: sem frames"
+
+        p50, p95, p99 = np.percentile(self.frame_times, [50, 95, 99])
+        lines = [f"frame: p50 {p50:.2f} ms  p95 {p95:.2f} ms  p99 {p99:.2f} ms"]
+        for name, times in sorted(self.cpu_times.items()):
+            lines.append(f"  cpu {name}: {np.mean(times):.3f} ms")
+        for name, times in sorted(self.gpu_times.items()):
+            lines.append(f"  gpu {name}: {np.mean(times):.3f} ms")
+        return "\n".join(lines)
+
+    def export_chrome_trace(self, path: str):
+        # formato "Trace Event" (abre em chrome://tracing ou no Perfetto)
+        trace = []
+        # copia: a thread da simulacao pode estar adicionando eventos
+        for name, start, value, tid in list(self.events):
+            ts = (start - self.origin) * 1e6
+            if name == "gpu":
+                trace.append({"name": "gpu ms", "ph": "C", "ts": ts,
+                              "pid": 0, "args": value})
+            else:
+                trace.append({"name": name, "ph": "X", "ts": ts,
+                              "dur": (value - start) * 1e6, "pid": 0, "tid": tid})
+
+        with open(path, 'w') as f:
+            json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, f)
+
+    def reset(self):
+        self.events.clear()
+        self.frame_times.clear()
+        self.cpu_times.clear()
+        self.gpu_times.clear()
+        self._frame_gpu.clear()
+
+    def cleanup(self):
+        for timer in self._gpu_timers.values():
+            timer.cleanup()
+        self._gpu_timers.clear()
+
+
+# instancia usada pelo jogo e pela simulacao
+profiler = Profiler()
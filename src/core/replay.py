@@ -0,0 +1,93 @@
+import struct
+
+# acoes do jogador gravadas na sessao (ja resolvidas: espaco no game over
+# vira ACTION_RESET, nao ACTION_JUMP)
+ACTION_LEFT = 1
+ACTION_RIGHT = 2
+ACTION_JUMP = 3
+ACTION_RESET = 4
+
+# formato: cabecalho e depois uma sequencia de registros; cada acao ocupa
+# 1 byte (o codigo) e cada frame 9 bytes (tag 0 + delta em float64).
+# as acoes de um frame vem antes do registro do proprio frame
+_MAGIC = b"BRSESSN"
+_VERSION = 1
+_HEADER = struct.Struct("<7sBqd")     # magic, versao, seed, passo fixo
+_FRAME = struct.Struct("<Bd")
+_FRAME_TAG = 0
+_FLUSH_SIZE = 64 * 1024
+
+
+class SessionRecorder:
+    # grava as entradas e os deltas de frame de uma partida
+    def __init__(self, path: str, seed: int, delta_time: float):
+        self.path = path
+        self.frames = 0
+        self._file = open(path, 'wb')
+        self._buffer = bytearray(_HEADER.pack(_MAGIC, _VERSION, seed, delta_time))
+
+    def action(self, action: int):
+        self._buffer.append(action)
+
+    def frame(self, delta_time: float):
+        self._buffer += _FRAME.pack(_FRAME_TAG, delta_time)
+        self.frames += 1
+        if len(self._buffer) >= _FLUSH_SIZE:
+            self._flush()
+
+    def _flush(self):
+        self._file.write(self._buffer)
+        self._buffer.clear()
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._flush()
+        self._file.close()
+
+
+class Session:
+    # sessao gravada: seed, passo fixo e a lista de (delta, acoes) por frame
+    def __init__(self, seed: int, delta_time: float, frames: list):
+        self.seed = seed
+        self.delta_time = delta_time
+        self.frames = frames
+
+    def __len__(self):
+        return len(self.frames)
+
+    @property
+    def duration(self) -> float:
+        return sum(delta_time for delta_time, _ in self.frames)
+
+
+def load_session(path: str) -> Session:
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    if len(data) < _HEADER.size:
+        raise ValueError(f"{path}: arquivo de sessao incompleto")
+    magic, version, seed, fixed_delta = _HEADER.unpack_from(data)
+    if magic != _MAGIC:
+        raise ValueError(f"{path}: nao e uma sessao gravada")
+    if version != _VERSION:
+        raise ValueError(f"{path}: versao de sessao {version} nao suportada")
+
+    frames = []
+    actions = []
+    offset = _HEADER.size
+    # um frame cortado no fim (jogo fechado a forca) e descartado
+    while offset < len(data):
+        tag = data[offset]
+        if tag != _FRAME_TAG:
+            actions.append(tag)
+            offset += 1
+            continue
+        if offset + _FRAME.size > len(data):
+            break
+        _, delta_time = _FRAME.unpack_from(data, offset)
+        frames.append((delta_time, tuple(actions)))
+        actions.clear()
+        offset += _FRAME.size
+
+    return Session(seed, fixed_delta, frames)
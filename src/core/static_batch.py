@@ -0,0 +1,51 @@
+import numpy as np
+
+from .mesh import Mesh
+from .model_loader import index_vertices
+
+
+class StaticBatch:
+    # junta geometrias que nunca se movem em um unico VBO/EBO; cada grupo
+    # ocupa um intervalo continuo de indices e pode ter seus proprios uniforms
+    def __init__(self):
+        self.parts = []
+        self.mesh = None
+        self.ranges = {}
+
+    def add(self, group: str, vertices_data, layer: int):
+        vertices, indices = index_vertices(vertices_data, 8)
+        self.parts.append((group, vertices, indices, layer))
+
+    def build(self):
+        # agrupa as partes por grupo, mantendo a ordem em que foram adicionadas
+        groups = list(dict.fromkeys(part[0] for part in self.parts))
+        parts = sorted(self.parts, key=lambda part: groups.index(part[0]))
+
+        all_vertices, all_indices, all_layers = [], [], []
+        vertex_offset = 0
+        index_offset = 0
+
+        for group, vertices, indices, layer in parts:
+            all_vertices.append(vertices)
+            all_indices.append(indices.astype(np.uint32) + vertex_offset)
+            all_layers.append(np.full(len(vertices), layer, dtype=np.float32))
+
+            first, count = self.ranges.get(group, (index_offset, 0))
+            self.ranges[group] = (first, count + len(indices))
+
+            vertex_offset += len(vertices)
+            index_offset += len(indices)
+
+        vertices = np.concatenate(all_vertices)
+        indices = np.concatenate(all_indices)
+        if vertex_offset <= 0xFFFF:
+            indices = indices.astype(np.uint16)
+
+        self.mesh = Mesh(vertices, len(vertices), has_texture=True,
+                         indices=indices, layer=np.concatenate(all_layers))
+        self.parts = []
+        return self
+
+    def cleanup(self):
+        if self.mesh is not None:
+            self.mesh.cleanup()
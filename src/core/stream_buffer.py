@@ -0,0 +1,149 @@
+import ctypes
+
+import numpy as np
+from OpenGL.GL import *
+
+# regioes do anel: a CPU escreve em uma enquanto a GPU ainda le as outras
+STREAM_REGIONS = 3
+FLOAT_BYTE_SIZE = 4
+PERSISTENT_MAP_FLAGS = GL_MAP_WRITE_BIT | GL_MAP_PERSISTENT_BIT | GL_MAP_COHERENT_BIT
+
+_persistent_supported = None
+
+
+def persistent_mapping_supported() -> bool:
+    # glBufferStorage (GL 4.4 ou ARB_buffer_storage) e os desenhos com base
+    # instance (GL 4.2 ou ARB_base_instance), que apontam cada regiao do anel
+    # sem refazer os atributos do VAO. precisa de um contexto GL ativo
+    global _persistent_supported
+    if _persistent_supported is None:
+        version = (glGetIntegerv(GL_MAJOR_VERSION), glGetIntegerv(GL_MINOR_VERSION))
+        if version >= (4, 4):
+            _persistent_supported = True
+        else:
+            extensions = {glGetStringi(GL_EXTENSIONS, i)
+                          for i in range(glGetIntegerv(GL_NUM_EXTENSIONS))}
+            _persistent_supported = (b"GL_ARB_buffer_storage" in extensions and
+                                     b"GL_ARB_base_instance" in extensions)
+    return _persistent_supported
+
+
+def _float_view(address, count, item_floats):
+    # array NumPy sobre a memoria mapeada pelo driver (sem copia)
+    memory = (ctypes.c_float * (count * item_floats)).from_address(address)
+    return np.frombuffer(memory, dtype=np.float32).reshape(count, item_floats)
+
+
+class StreamBuffer:
+    # buffer para dados reescritos a cada frame (ex.: instancias), preenchidos
+    # direto de arrays NumPy. com buffer storage ele fica mapeado o tempo todo
+    # e e dividido em STREAM_REGIONS regioes usadas em anel, cada uma com um
+    # fence: a CPU so espera se a GPU ainda estiver lendo a regiao da vez.
+    # sem buffer storage, cada escrita orfana o buffer (glBufferData com NULL)
+    def __init__(self, item_floats: int, capacity: int = 256,
+                 target=GL_ARRAY_BUFFER, persistent: bool = None):
+        self.item_floats = item_floats
+        self.item_size = item_floats * FLOAT_BYTE_SIZE
+        self.target = target
+        if persistent is None:
+            persistent = persistent_mapping_supported()
+        self.persistent = persistent
+
+        # primeiro item e quantidade da ultima escrita (first vai para o
+        # base instance dos desenhos)
+        self.first = 0
+        self.count = 0
+
+        self.buffer = None
+        self._mapped = None
+        self._fences = [None] * STREAM_REGIONS
+        self._region = 0
+        self._unmap = False
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        # com buffer storage o tamanho e fixo: crescer e trocar de buffer
+        self._release()
+        self.capacity = capacity
+        self._region = 0
+        self.buffer = glGenBuffers(1)
+
+        glBindBuffer(self.target, self.buffer)
+        if self.persistent:
+            items = STREAM_REGIONS * capacity
+            glBufferStorage(self.target, items * self.item_size, None, PERSISTENT_MAP_FLAGS)
+            address = glMapBufferRange(self.target, 0, items * self.item_size,
+                                       PERSISTENT_MAP_FLAGS)
+            self._mapped = _float_view(address, items, self.item_floats).reshape(
+                STREAM_REGIONS, capacity, self.item_floats)
+        else:
+            glBufferData(self.target, capacity * self.item_size, None, GL_STREAM_DRAW)
+        glBindBuffer(self.target, 0)
+
+    def write(self, count: int):
+        # array (count, item_floats) a ser preenchido antes de commit(); no modo
+        # persistente e a propria memoria do buffer. o buffer pode ser trocado
+        # (quando count passa da capacidade): quem liga ele a um VAO confere
+        # self.buffer depois da escrita
+        if count > self.capacity:
+            self._allocate(max(count, 2 * self.capacity))
+        self.count = count
+
+        if self.persistent:
+            # os desenhos ja enviados com a regiao atual ficam marcados por um
+            # fence; a proxima regiao so e reescrita quando a GPU terminou com ela
+            self._fences[self._region] = glFenceSync(GL_SYNC_GPU_COMMANDS_COMPLETE, 0)
+            self._region = (self._region + 1) % STREAM_REGIONS
+            self._wait(self._region)
+            self.first = self._region * self.capacity
+            return self._mapped[self._region, :count]
+
+        self.first = 0
+        if not count:
+            return np.empty((0, self.item_floats), dtype=np.float32)
+
+        # o armazenamento antigo continua com a GPU; o novo ja pode ser mapeado
+        # sem sincronizar
+        glBindBuffer(self.target, self.buffer)
+        glBufferData(self.target, self.capacity * self.item_size, None, GL_STREAM_DRAW)
+        address = glMapBufferRange(self.target, 0, count * self.item_size,
+                                   GL_MAP_WRITE_BIT | GL_MAP_UNSYNCHRONIZED_BIT)
+        self._unmap = True
+        return _float_view(address, count, self.item_floats)
+
+    def commit(self):
+        # no modo persistente (mapeamento coerente) nao ha nada a fazer
+        if self._unmap:
+            glUnmapBuffer(self.target)
+            glBindBuffer(self.target, 0)
+            self._unmap = False
+
+    def _wait(self, region):
+        fence = self._fences[region]
+        if fence is None:
+            return
+        while glClientWaitSync(fence, GL_SYNC_FLUSH_COMMANDS_BIT,
+                               1_000_000) == GL_TIMEOUT_EXPIRED:
+            pass
+        glDeleteSync(fence)
+        self._fences[region] = None
+
+    def _release(self):
+        for region, fence in enumerate(self._fences):
+            if fence is not None:
+                glDeleteSync(fence)
+                self._fences[region] = None
+        if self.buffer is None:
+            return
+
+        if self._mapped is not None:
+            glBindBuffer(self.target, self.buffer)
+            glUnmapBuffer(self.target)
+            glBindBuffer(self.target, 0)
+            self._mapped = None
+        # a GPU ainda pode estar lendo: o driver so libera depois
+        glDeleteBuffers(1, [self.buffer])
+        self.buffer = None
+
+    def cleanup(self):
+        self._release()
@@ -1,6 +1,7 @@
 from .player import Player
-from .coin import Coin
-from .collectible import Collectible
+from .entity_pool import EntityPool, PoolSnapshot
+from .coin import CoinPool
+from .collectible import CollectiblePool
 from .creeper import Creeper
-from .magnet import Magnet
-from .obstacle import Obstacle
\ No newline at end of file
+from .magnet import MagnetPool
+from .obstacle import ObstaclePool
\ No newline at end of file
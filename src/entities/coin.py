@@ -1,14 +1,14 @@
 from core import constants as const
-from .collectible import Collectible
+from .collectible import CollectiblePool
 
 
-class Coin(Collectible):
-    def __init__(self, x: float, z: float):
+class CoinPool(CollectiblePool):
+    def __init__(self):
         super().__init__(
-            x=x,
             y=const.COIN_Y,
-            z=z,
             size=const.COIN_SIZE,
             scale_vec=None,
-            collision_factor=0.8
+            collision_factor=0.8,
+            # um grupo pode nascer quando ainda ha quase MAX_COINS ativas
+            capacity=const.MAX_COINS + const.GROUP_MAX_SIZE
         )
@@ -1,35 +1,19 @@
-import glm
-from core import constants as const
+from .entity_pool import EntityPool
 
 
-class Collectible:
-    def __init__(self, x: float, y: float, z: float, size: float, scale_vec=None, collision_factor=0.5):
-        self.position = glm.vec3(x, y, z)
+class CollectiblePool(EntityPool):
+    def __init__(self, y: float, size: float, scale_vec=None, collision_factor=0.5,
+                 capacity: int = 64):
+        super().__init__(capacity)
+        self.y = y
         self.size = size
-        self.collected = False
         self.collision_factor = collision_factor
 
         if scale_vec is None:
-            final_scale = glm.vec3(size)
+            self.final_scale = (size, size, size)
         else:
-            final_scale = scale_vec
+            self.final_scale = tuple(scale_vec)
 
-        self.scale_matrix = glm.scale(glm.mat4(1.0), final_scale)
-
-    def update(self, delta_time: float, current_speed: float):
-        self.position.z += current_speed * delta_time
-
-    def is_out_of_bounds(self) -> bool:
-        return self.position.z > const.UNCREATE_Z
-
-    def get_aabb(self):
+    def spawn(self, x: float, z: float) -> int:
         radius = self.size * self.collision_factor
-        return (
-            self.position.x - radius, self.position.x + radius,
-            self.position.y - radius, self.position.y + radius,
-            self.position.z - radius, self.position.z + radius
-        )
-
-    def get_model_matrix(self):
-        translate_matrix = glm.translate(glm.mat4(1.0), self.position)
-        return translate_matrix * self.scale_matrix
+        return self._add((x, self.y, z), (radius, radius, radius), self.final_scale)
@@ -1,9 +1,8 @@
 import glm
 import math
-from OpenGL.GL import *
+from array import array
+from bisect import bisect_left
 from core import constants as const
-from core import Mesh, load_obj
-from graphics import load_texture
 
 
 class Creeper:
@@ -13,23 +12,25 @@ class Creeper:
         self.BOUNCE_HEIGHT = 0.05
         self.ROTATION_SPEED = 3.0
         self.DELAY_SECONDS = 0.15
-        self.HISTORY_RETENTION = 2.0
+        # amostras guardadas do player (sobra mesmo com passos bem pequenos)
+        self.HISTORY_SIZE = 512
         self.LERP_SPEED_X = 10.0
         self.LERP_SPEED_Y = 15.0
         self.ANIMATION_SPEED = 15.0
 
-        self._init_resources()
-        self._init_state()
-
-    def _init_resources(self):
-        model_path = "src/assets/models/creeper/creeper.obj"
-        texture_path = "src/assets/textures/creeper/creeper.png"
+        # historico em buffer circular de tamanho fixo; cada amostra e gravada
+        # duas vezes (i e i + HISTORY_SIZE) para a janela ativa ser sempre
+        # contigua e a busca binaria funcionar mesmo depois de dar a volta
+        self._history_t = array('d', [0.0]) * (2 * self.HISTORY_SIZE)
+        self._history_x = array('d', [0.0]) * (2 * self.HISTORY_SIZE)
+        self._history_y = array('d', [0.0]) * (2 * self.HISTORY_SIZE)
 
-        vertices_data = load_obj(model_path)
-        vertex_count = len(vertices_data) // 8
+        # partes constantes da matriz model
+        self._rotation_y = glm.rotate(
+            glm.mat4(1.0), glm.radians(180), glm.vec3(0.0, 1.0, 0.0))
+        self._scale_matrix = glm.scale(glm.mat4(1.0), glm.vec3(self.SCALE))
 
-        self.mesh = Mesh(vertices_data, vertex_count, has_texture=True)
-        self.texture_id = load_texture(texture_path)
+        self._init_state()
 
     def _init_state(self):
         # estado inicial
@@ -37,7 +38,12 @@ class Creeper:
         self.timer = 0.0
         self.run_animation_time = 0.0
 
-        self.position_history = []
+        self._history_start = 0
+        self._history_count = 0
+
+        self._model_pose = None
+        self._model_matrix = None
+        self._normal_matrix = None
 
     def update(self, delta_time: float, player_x: float, player_y: float):
         self.timer += delta_time
@@ -49,20 +55,38 @@ class Creeper:
         self._apply_movement(target_x, target_y, delta_time)
 
     def _update_history(self, p_x, p_y):
-        self.position_history.append((self.timer, p_x, p_y))
-        cutoff_time = self.timer - self.HISTORY_RETENTION
-        self.position_history = [
-            p for p in self.position_history if p[0] > cutoff_time]
+        size = self.HISTORY_SIZE
+        index = (self._history_start + self._history_count) % size
+        self._history_t[index] = self._history_t[index + size] = self.timer
+        self._history_x[index] = self._history_x[index + size] = p_x
+        self._history_y[index] = self._history_y[index + size] = p_y
+
+        # cheio: a amostra mais antiga e sobrescrita
+        if self._history_count < size:
+            self._history_count += 1
+        else:
+            self._history_start = (self._history_start + 1) % size
 
     def _get_delayed_target(self, current_x, current_y):
         target_time = self.timer - self.DELAY_SECONDS
-
-        # procura a posição que o player estava
-        for t, h_x, h_y in self.position_history:
-            if t >= target_time:
-                return h_x, h_y
-
-        return current_x, current_y
+        start = self._history_start
+        stop = start + self._history_count
+
+        # primeira amostra no instante procurado ou depois dele
+        index = bisect_left(self._history_t, target_time, start, stop)
+        if index == stop:
+            return current_x, current_y
+        if index == start:
+            return self._history_x[index], self._history_y[index]
+
+        # interpola entre as duas amostras vizinhas
+        previous = index - 1
+        t0 = self._history_t[previous]
+        a = (target_time - t0) / (self._history_t[index] - t0)
+        x0 = self._history_x[previous]
+        y0 = self._history_y[previous]
+        return (x0 + (self._history_x[index] - x0) * a,
+                y0 + (self._history_y[index] - y0) * a)
 
     def _apply_movement(self, target_x, target_y, delta_time):
         self.position.x += (target_x - self.position.x) * \
@@ -70,20 +94,23 @@ class Creeper:
         self.position.y += (target_y - self.position.y) * \
             self.LERP_SPEED_Y * delta_time
 
-    def draw(self, shader_program):
-        glActiveTexture(GL_TEXTURE0)
-        glBindTexture(GL_TEXTURE_2D, self.texture_id)
-
-        model_matrix = self._compute_model_matrix()
-
-        loc_model = glGetUniformLocation(shader_program, "model")
-        glUniformMatrix4fv(loc_model, 1, GL_FALSE, glm.value_ptr(model_matrix))
-
-        glBindVertexArray(self.mesh.vao)
-        glDrawArrays(GL_TRIANGLES, 0, self.mesh.vertices_count)
-        glBindVertexArray(0)
-
-    def _compute_model_matrix(self):
+    def get_model_matrix(self):
+        # refeita apenas quando a posicao ou a animacao mudam
+        pose = (self.position.x, self.position.y, self.position.z,
+                self.run_animation_time)
+        if pose != self._model_pose:
+            self._model_pose = pose
+            self._model_matrix = self._build_model_matrix()
+            self._normal_matrix = None
+        return self._model_matrix
+
+    def get_normal_matrix(self):
+        model = self.get_model_matrix()
+        if self._normal_matrix is None:
+            self._normal_matrix = glm.transpose(glm.inverse(glm.mat3(model)))
+        return self._normal_matrix
+
+    def _build_model_matrix(self):
         visual_y = self.position.y + self.VISUAL_Y_OFFSET
 
         if self.position.y < const.PLAYER_BASE_Y + 0.1:
@@ -95,17 +122,7 @@ class Creeper:
         # construção da Matriz
         mat_transform = glm.translate(glm.mat4(1.0), glm.vec3(
             self.position.x, visual_y, self.position.z))
-        mat_rotation_y = glm.rotate(
-            glm.mat4(1.0), glm.radians(180), glm.vec3(0.0, 1.0, 0.0))
         mat_anim_rot = glm.rotate(glm.mat4(1.0), glm.radians(
             rotation_z), glm.vec3(0.0, 0.0, 1.0))
-        mat_scale = glm.scale(glm.mat4(1.0), glm.vec3(self.SCALE))
-
-        return mat_transform * mat_rotation_y * mat_anim_rot * mat_scale
 
-    def cleanup(self):
-        if hasattr(self, 'mesh'):
-            glDeleteVertexArrays(1, [self.mesh.vao])
-            glDeleteBuffers(1, [self.mesh.vbo])
-        if hasattr(self, 'texture_id'):
-            glDeleteTextures(1, [self.texture_id])
+        return mat_transform * self._rotation_y * mat_anim_rot * self._scale_matrix
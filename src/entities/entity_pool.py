@@ -0,0 +1,283 @@
+import itertools
+
+import numpy as np
+from core import constants as const
+
+# versoes unicas entre todas as pools (e suas copias): a mesma versao sempre
+# significa o mesmo conteudo
+_versions = itertools.count(1)
+
+
+class EntityPool:
+    # entidades de um mesmo tipo guardadas em arrays contiguos (structure of arrays),
+    # sempre em ordem de z decrescente (da mais proxima do jogador para a mais
+    # distante); como todas andam juntas em z a ordem se mantem, e as consultas
+    # por z viram buscas binarias.
+    # os buffers tem capacidade fixa: as entidades saem pelo inicio (passaram do
+    # jogador ou foram coletadas perto dele) e entram pelo fim, entao remover e
+    # so avancar o inicio e nada e alocado por frame.
+    # as linhas de instancia (model + normal) andam junto com os outros arrays:
+    # escala e matriz normal sao gravadas uma vez ao criar, e so a translacao
+    # e atualizada quando alguma entidade se moveu
+    def __init__(self, capacity: int = 64):
+        self.count = 0
+        self._buffers = self._allocate(capacity)
+        self._set_head(0)
+        # maior meia profundidade ja inserida, para alargar as janelas em z
+        self.max_half_depth = 0.0
+        # muda a cada alteracao, para o render saber quando reenviar as instancias
+        self.version = next(_versions)
+        self._moved = False
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def capacity(self):
+        return len(self._buffers[0])
+
+    @staticmethod
+    def _allocate(capacity):
+        # position, half_extent, scale e as linhas de instancia
+        return (np.zeros((capacity, 3), dtype=np.float32),
+                np.zeros((capacity, 3), dtype=np.float32),
+                np.zeros((capacity, 3), dtype=np.float32),
+                np.zeros((capacity, 16 + 9), dtype=np.float32))
+
+    def _set_head(self, head: int):
+        # os arrays publicos sao vistas que comecam na primeira ativa
+        self.head = head
+        self._arrays = tuple(buffer[head:] for buffer in self._buffers)
+        self.position, self.half_extent, self.scale, self._instances = self._arrays
+
+    def _make_room(self):
+        # o fim do buffer foi alcancado: o bloco ativo volta para o inicio;
+        # so cresce se todas as posicoes estiverem ocupadas
+        if self.count == self.capacity:
+            self._grow()
+            return
+
+        for buffer in self._buffers:
+            buffer[:self.count] = buffer[self.head:self.head + self.count]
+        self._set_head(0)
+
+    def _grow(self):
+        new_capacity = self.capacity * 2
+        active = slice(self.head, self.head + self.count)
+        buffers = self._allocate(new_capacity)
+        for new, old in zip(buffers, self._buffers):
+            new[:self.count] = old[active]
+        self._buffers = buffers
+        self._set_head(0)
+
+    def _add(self, position, half_extent, scale) -> int:
+        if self.head + self.count == self.capacity:
+            self._make_room()
+
+        # quase sempre a entidade nasce no fim da pista e entra no final
+        index = self._insertion_index(position[2])
+        if index < self.count:
+            for array in self._arrays:
+                array[index + 1:self.count + 1] = array[index:self.count]
+
+        self.position[index] = position
+        self.half_extent[index] = half_extent
+        self.scale[index] = scale
+        self._write_instance(index, position, scale)
+        self.count += 1
+        self.max_half_depth = max(self.max_half_depth, float(half_extent[2]))
+        self.version = next(_versions)
+        return index
+
+    def _write_instance(self, index, position, scale):
+        # model = translate * scale (4x4) e a matriz normal
+        # transpose(inverse(mat3(model))) = scale inversa (3x3), em ordem de coluna
+        row = self._instances[index]
+        row[:] = 0.0
+        row[0], row[5], row[10] = scale
+        row[12:15] = position
+        row[15] = 1.0
+        row[16], row[20], row[24] = 1.0 / self.scale[index]
+
+    def _insertion_index(self, z: float) -> int:
+        # depois de todas com z >= z, mantendo a ordem de chegada nos empates
+        if self.count == 0 or z <= self.position[self.count - 1, 2]:
+            return self.count
+        return int(np.searchsorted(-self.position[:self.count, 2], -z, side="right"))
+
+    def clear(self):
+        self.count = 0
+        self._set_head(0)
+        self.max_half_depth = 0.0
+        self.version = next(_versions)
+
+    def advance(self, distance: float):
+        # todas as entidades andam em z de uma vez (a ordem nao muda)
+        self.position[:self.count, 2] += distance
+        self._moved = True
+        self.version = next(_versions)
+
+    def move(self, indices, positions):
+        # reposiciona entidades individuais (ex.: moedas puxadas pelo ima)
+        self.position[indices] = positions
+        self._moved = True
+        self.version = next(_versions)
+
+    def z_window(self, z_min: float, z_max: float):
+        # intervalo [start, stop) das entidades com z_min <= z <= z_max
+        return _z_window(self.position[:self.count, 2], z_min, z_max)
+
+    def restore_order(self):
+        # volta a ordenar por z depois de movimentos individuais (ima), mexendo
+        # apenas no trecho fora de ordem; devolve a permutacao aplicada ou None
+        z = self.position[:self.count, 2]
+        unordered = np.flatnonzero(z[1:] > z[:-1]) if self.count > 1 else ()
+        if not len(unordered):
+            return None
+
+        start, stop = int(unordered[0]), int(unordered[-1]) + 2
+        span = z[start:stop]
+        # vizinhos ordenados que ainda cabem entre o maior e o menor z do trecho
+        start = int(np.searchsorted(-z[:start], -span.max(), side="right"))
+        stop += int(np.searchsorted(-z[stop:], -span.min(), side="left"))
+
+        order = np.arange(self.count)
+        order[start:stop] = start + np.argsort(-z[start:stop], kind="stable")
+        for array in self._arrays:
+            array[start:stop] = array[order[start:stop]]
+        self.version = next(_versions)
+        return order
+
+    def remove_passed(self) -> int:
+        # as que passaram do jogador ficam todas no inicio: basta avancar o inicio
+        if not self.count or self.position[0, 2] <= const.UNCREATE_Z:
+            return 0
+
+        passed = int(np.searchsorted(-self.position[:self.count, 2],
+                                     -const.UNCREATE_Z, side="left"))
+        self._set_head(self.head + passed)
+        self.count -= passed
+        self.version = next(_versions)
+        return passed
+
+    def aabb(self, start: int = 0, stop: int = None):
+        stop = self.count if stop is None else stop
+        position = self.position[start:stop]
+        half_extent = self.half_extent[start:stop]
+        return position - half_extent, position + half_extent
+
+    def hits(self, box, sweep: float = 0.0, previous_box=None):
+        # testa a AABB (min_x, max_x, min_y, max_y, min_z, max_z) apenas contra
+        # as entidades cuja faixa em z pode encostar nela. o teste e continuo:
+        # sweep e quanto as entidades andaram em z no ultimo passo e
+        # previous_box e a AABB no inicio dele; as duas caixas andam em linha
+        # reta em x e z e so conta se elas se cruzarem no mesmo instante do
+        # passo (trocar de faixa enquanto um obstaculo passa nao e colisao).
+        # em y vale a caixa do fim do passo, como no pouso sobre o obstaculo
+        motion = [0.0, 0.0, -sweep]
+        if previous_box is not None:
+            for axis in (0, 2):
+                motion[axis] += box[2 * axis] - previous_box[2 * axis]
+
+        mask = np.zeros(self.count, dtype=bool)
+        start, stop = self.z_window(box[4] - self.max_half_depth - max(motion[2], 0.0),
+                                    box[5] + self.max_half_depth + max(-motion[2], 0.0))
+        if start == stop:
+            return mask
+
+        # a posicao relativa no instante do passo e a do fim + u * motion
+        # (u = 1 no inicio, u = 0 no fim); cada eixo da o intervalo de u em
+        # que as caixas se sobrepoem
+        box_min, box_max = self.aabb(start, stop)
+        enter = np.zeros(stop - start)
+        leave = np.ones(stop - start)
+        for axis, move in enumerate(motion):
+            low = box[2 * axis] - box_max[:, axis]
+            high = box[2 * axis + 1] - box_min[:, axis]
+            if move == 0.0:
+                leave[(low >= 0.0) | (high <= 0.0)] = -1.0
+            elif move > 0.0:
+                np.maximum(enter, low / move, out=enter)
+                np.minimum(leave, high / move, out=leave)
+            else:
+                np.maximum(enter, high / move, out=enter)
+                np.minimum(leave, low / move, out=leave)
+        mask[start:stop] = enter < leave
+        return mask
+
+    def remove(self, mask):
+        # as removidas ficam perto do jogador (inicio dos arrays): so as
+        # restantes antes da ultima removida andam para frente, mantendo a ordem
+        removed = np.flatnonzero(mask)
+        if not len(removed):
+            return
+
+        last = int(removed[-1]) + 1
+        gap = len(removed)
+        if gap < last:
+            keep = ~mask[:last]
+            for array in self._arrays:
+                array[gap:last] = array[:last][keep]
+
+        self._set_head(self.head + gap)
+        self.count -= gap
+        self.version = next(_versions)
+
+    def instance_data(self):
+        # linhas (n, 25) prontas para o buffer de instancias; escala e matriz
+        # normal nao mudam, so a translacao acompanha as posicoes
+        data = self._instances[:self.count]
+        if self._moved:
+            data[:, 12:15] = self.position[:self.count]
+            self._moved = False
+        return data
+
+
+class PoolSnapshot:
+    # copia somente leitura de uma pool (posicoes, escalas e linhas de
+    # instancia), publicada pela thread da simulacao para o render; os
+    # buffers sao reaproveitados entre copias e so crescem
+    def __init__(self):
+        self.count = 0
+        self.version = 0
+        self.max_half_depth = 0.0
+        self._buffers = EntityPool._allocate(0)
+        self._set_views()
+
+    def _set_views(self):
+        position, _, scale, instances = self._buffers
+        self.position = position[:self.count]
+        self.scale = scale[:self.count]
+        self._instances = instances[:self.count]
+
+    def copy_from(self, pool: EntityPool):
+        count = pool.count
+        if count > len(self._buffers[0]):
+            self._buffers = EntityPool._allocate(max(count, 2 * len(self._buffers[0])))
+
+        position, _, scale, instances = self._buffers
+        position[:count] = pool.position[:count]
+        scale[:count] = pool.scale[:count]
+        instances[:count] = pool.instance_data()
+
+        self.count = count
+        self.version = pool.version
+        self.max_half_depth = pool.max_half_depth
+        self._set_views()
+
+    def __len__(self):
+        return self.count
+
+    def z_window(self, z_min: float, z_max: float):
+        return _z_window(self.position[:, 2], z_min, z_max)
+
+    def instance_data(self):
+        return self._instances
+
+
+def _z_window(z, z_min: float, z_max: float):
+    # z em ordem decrescente
+    neg_z = -z
+    start = int(np.searchsorted(neg_z, -z_max, side="left"))
+    stop = int(np.searchsorted(neg_z, -z_min, side="right"))
+    return start, max(start, stop)
@@ -1,15 +1,13 @@
-import glm
 from core import constants as const
-from .collectible import Collectible
+from .collectible import CollectiblePool
 
 
-class Magnet(Collectible):
-    def __init__(self, x: float, z: float):
+class MagnetPool(CollectiblePool):
+    def __init__(self):
         super().__init__(
-            x=x,
             y=const.COIN_Y,
-            z=z,
             size=const.MAGNET_SIZE,
-            scale_vec=glm.vec3(1.0),
-            collision_factor=0.5
+            scale_vec=(1.0, 1.0, 1.0),
+            collision_factor=0.5,
+            capacity=16
         )
@@ -17,6 +17,11 @@ class Player:
         self.EXTENT_Y = 0.25
         self.EXTENT_Z = 0.15
 
+        # partes constantes da matriz model
+        self._rot_base = glm.rotate(
+            glm.mat4(1.0), glm.radians(180), glm.vec3(0.0, 1.0, 0.0))
+        self._scale_matrix = glm.scale(glm.mat4(1.0), glm.vec3(self.SCALE))
+
         self._init_state()
 
     def _init_state(self):
@@ -35,6 +40,10 @@ class Player:
 
         self.run_animation_time = 0.0
 
+        self._model_pose = None
+        self._model_matrix = None
+        self._normal_matrix = None
+
     def update(self, delta_time: float):
         if self.is_dead:
             return
@@ -102,6 +111,23 @@ class Player:
         )
 
     def get_model_matrix(self):
+        # a matriz so e refeita quando a pose muda (parado, morto ou no meio
+        # de um frame sem passo de simulacao ela e reaproveitada)
+        pose = (self.position.x, self.position.y, self.position.z,
+                self.is_dead, self.is_jumping, self.run_animation_time)
+        if pose != self._model_pose:
+            self._model_pose = pose
+            self._model_matrix = self._build_model_matrix()
+            self._normal_matrix = None
+        return self._model_matrix
+
+    def get_normal_matrix(self):
+        model = self.get_model_matrix()
+        if self._normal_matrix is None:
+            self._normal_matrix = glm.transpose(glm.inverse(glm.mat3(model)))
+        return self._normal_matrix
+
+    def _build_model_matrix(self):
         visual_y = self.position.y + self.MODEL_OFFSET_Y
         rotation_z = 0.0
         death_rotation_x = 0.0
@@ -119,14 +145,11 @@ class Player:
         mat_trans = glm.translate(glm.mat4(1.0), glm.vec3(
             self.position.x, visual_y, self.position.z))
 
-        # rotacoes
-        mat_rot_base = glm.rotate(
-            glm.mat4(1.0), glm.radians(180), glm.vec3(0.0, 1.0, 0.0))
+        # rotacoes (a base e a escala sao fixas)
         mat_rot_anim = glm.rotate(glm.mat4(1.0), glm.radians(
             rotation_z), glm.vec3(0.0, 0.0, 1.0))
         mat_rot_death = glm.rotate(glm.mat4(1.0), glm.radians(
             death_rotation_x), glm.vec3(1.0, 0.0, 0.0))
 
-        mat_scale = glm.scale(glm.mat4(1.0), glm.vec3(self.SCALE))
-
-        return mat_trans * mat_rot_base * mat_rot_death * mat_rot_anim * mat_scale
+        return (mat_trans * self._rot_base * mat_rot_death * mat_rot_anim *
+                self._scale_matrix)
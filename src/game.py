@@ -1,23 +1,54 @@
+import io
+import random
+import time
+from functools import partial
+
 import glfw
 from OpenGL.GL import *
-import random
 import glm
+import numpy as np
 import pygame
 
-from core import Mesh, load_obj
+from core import load_mesh
 from core import constants as const
-from entities import Player, Coin, Creeper, Magnet, Obstacle
-from graphics import load_shader_program, load_texture
+from core.asset_manager import AssetManager, read_bytes
+from core.profiler import profiler
+from core.replay import (ACTION_JUMP, ACTION_LEFT, ACTION_RESET, ACTION_RIGHT,
+                         SessionRecorder, load_session)
+from core.mesh import InstanceBuffer, Mesh
+from core.static_batch import StaticBatch
+from graphics import (PASS_OPAQUE, PASS_OVERLAY, FrameUniformBuffer, Frustum, GpuTimer,
+                      RenderQueue, create_texture_array, decode_texture, delete_shader_program,
+                      get_uniform_location, get_uniform_locations, load_shader_program,
+                      local_bounds, uniform_mat3, uniform_mat4, uniform_vec2,
+                      uniform_vec3, upload_texture_layer)
+from sim_thread import SimulationThread, Snapshot
+from simulation import Simulation
 
 
 class Game:
-    def __init__(self):
+    def __init__(self, headless=False, seed=None):
+        self.start_time = time.perf_counter()
+        self.time_to_first_frame = None
         self.width = const.WIDTH
         self.height = const.HEIGHT
+        # seed da partida; sem seed um aleatorio e sorteado (e fica na gravacao)
+        self.seed = random.getrandbits(63) if seed is None else seed
+
+        # headless: sem janela nem audio, usando um contexto GL ja ativo
+        # (criado por fora, como nos benchmarks)
+        self.headless = headless
+        if headless:
+            self.window = None
+            glEnable(GL_DEPTH_TEST)
+        else:
+            self.window = self._init_window()
 
-        self.window = self._init_window()
-        self._init_audio()
+        # os assets criticos sao pedidos antes do audio para serem lidos primeiro
+        self.assets = AssetManager()
         self._init_assets()
+        if not headless:
+            self._init_audio()
         self._init_game_entities()
         self._init_game_state()
 
@@ -32,188 +63,408 @@ class Game:
         return window
 
     def _init_audio(self):
-        # inicia os audios do jogo
+        # sons e musica nao sao criticos: o jogo comeca sem eles e eles entram
+        # assim que forem decodificados
         pygame.mixer.init()
-        self.sfx_coin = pygame.mixer.Sound("src/assets/sounds/coin.mp3")
-        self.sfx_game_over = pygame.mixer.Sound(
-            "src/assets/sounds/game_over.mp3")
-
-        self.sfx_coin.set_volume(0.1)
-        self.sfx_game_over.set_volume(0.5)
-
-        pygame.mixer.music.load("src/assets/sounds/music.mp3")
+        self.sfx_coin = None
+        self.sfx_game_over = None
+
+        self.assets.load("sound.coin", pygame.mixer.Sound, "src/assets/sounds/coin.mp3",
+                         on_ready=partial(self._on_sound_loaded, "sfx_coin", 0.1))
+        self.assets.load("sound.game_over", pygame.mixer.Sound,
+                         "src/assets/sounds/game_over.mp3",
+                         on_ready=partial(self._on_sound_loaded, "sfx_game_over", 0.5))
+        # o mixer.music e global no pygame: a thread so le o arquivo e o
+        # load acontece no on_ready, na thread principal
+        self.assets.load("music", read_bytes, "src/assets/sounds/music.mp3",
+                         on_ready=self._on_music_loaded)
+
+    def _on_sound_loaded(self, name, volume, sound):
+        sound.set_volume(volume)
+        setattr(self, name, sound)
+
+    def _on_music_loaded(self, data):
+        # o pygame le o stream aos poucos: o arquivo em memoria fica guardado
+        self._music_file = io.BytesIO(data)
+        pygame.mixer.music.load(self._music_file, "mp3")
         pygame.mixer.music.set_volume(0.1)
-        pygame.mixer.music.play(-1)
+        if not self.snapshot.is_game_over:
+            pygame.mixer.music.play(-1)
 
     def _init_assets(self):
-        self.textures = {
-            "road": load_texture("src/assets/textures/road/road.png"),
-            "separator": load_texture("src/assets/textures/road/separator.jpg"),
-            "floor": load_texture("src/assets/textures/background/floor.png"),
-            "wall": load_texture("src/assets/textures/background/wall.png"),
-            "metal": load_texture("src/assets/textures/obstacle/body.jpg"),
-            "gold": load_texture("src/assets/textures/coin/gold.png"),
-            "player": load_texture("src/assets/textures/player/player.jpg")
+        # todas as texturas ficam em camadas de uma unica textura array; as
+        # camadas sao decodificadas nas threads do AssetManager e enviadas a
+        # GPU conforme ficam prontas
+        texture_paths = {
+            "road": "src/assets/textures/road/road.png",
+            "separator": "src/assets/textures/road/separator.jpg",
+            "floor": "src/assets/textures/background/floor.png",
+            "wall": "src/assets/textures/background/wall.png",
+            "metal": "src/assets/textures/obstacle/body.jpg",
+            "gold": "src/assets/textures/coin/gold.png",
+            "player": "src/assets/textures/player/player.jpg",
+            "creeper": "src/assets/textures/creeper/creeper.png"
         }
+        self.texture_layers = {name: layer for layer, name in enumerate(texture_paths)}
+        self.texture_array = create_texture_array(len(texture_paths))
+
+        # pista, obstaculos, moedas e player sao criticos; o creeper chega depois
+        for name, path in texture_paths.items():
+            if name != "creeper":
+                self._load_texture_layer(name, path, critical=True)
+        self.assets.load("mesh.player", load_mesh, "src/assets/models/player/steve.obj",
+                         on_ready=self._on_player_mesh_loaded, critical=True)
+
+        self._load_texture_layer("creeper", texture_paths["creeper"])
+        self.assets.load("mesh.creeper", load_mesh, "src/assets/models/creeper/creeper.obj",
+                         on_ready=self._on_creeper_mesh_loaded)
 
         self.shader_texture = load_shader_program(
             "src/assets/shaders/vertexShader.glsl", "src/assets/shaders/fragmentShader.glsl")
-        glUseProgram(self.shader_texture)
-
-        self.uniforms_texture = {
-            "model": glGetUniformLocation(self.shader_texture, "model"),
-            "view": glGetUniformLocation(self.shader_texture, "view"),
-            "proj": glGetUniformLocation(self.shader_texture, "projection"),
-            "uv_offset": glGetUniformLocation(self.shader_texture, "uvOffset"),
-            "light_pos": glGetUniformLocation(self.shader_texture, "lightPos"),
-            "light_color": glGetUniformLocation(self.shader_texture, "lightColor"),
-            "view_pos": glGetUniformLocation(self.shader_texture, "viewPos"),
-        }
+
+        self.uniforms_texture = get_uniform_locations(self.shader_texture, {
+            "model": "model",
+            "normal": "normalMatrix",
+            "uv_offset": "uvOffset",
+        })
 
         self.shader_color = load_shader_program(
             "src/assets/shaders/colorVertex.glsl", "src/assets/shaders/colorFragment.glsl"
         )
-        glUseProgram(self.shader_color)
-
-        self.uniforms_color = {
-            "model": glGetUniformLocation(self.shader_color, "model"),
-            "view": glGetUniformLocation(self.shader_color, "view"),
-            "proj": glGetUniformLocation(self.shader_color, "projection"),
-            "light_pos": glGetUniformLocation(self.shader_color, "lightPos"),
-            "light_color": glGetUniformLocation(self.shader_color, "lightColor"),
-            "view_pos": glGetUniformLocation(self.shader_color, "viewPos"),
+
+        self.uniforms_color = get_uniform_locations(self.shader_color, {
+            "model": "model",
+            "normal": "normalMatrix",
+            "tint": "tint",
+        })
+
+        # versoes instanciadas: a matriz model vem de um atributo por instancia
+        self.shader_texture_instanced = load_shader_program(
+            "src/assets/shaders/vertexShader.glsl", "src/assets/shaders/fragmentShader.glsl",
+            defines=("INSTANCED",))
+
+        self.shader_color_instanced = load_shader_program(
+            "src/assets/shaders/colorVertex.glsl", "src/assets/shaders/colorFragment.glsl",
+            defines=("INSTANCED",))
+
+        glUseProgram(self.shader_color_instanced)
+        glUniform3f(get_uniform_location(
+            self.shader_color_instanced, "tint"), 1.0, 1.0, 1.0)
+        # deslocamento em z das instancias entre dois passos da simulacao
+        self.instance_offset_locations = {
+            program: get_uniform_location(program, "instanceOffset")
+            for program in (self.shader_texture_instanced, self.shader_color_instanced)
         }
 
+        # camera e luz: um unico buffer por frame, lido por todos os programas
+        self.frame_uniforms = FrameUniformBuffer()
+        # desenhos de cada frame, ordenados e enviados sem estado repetido;
+        # cada (pass, programa) tem seu escopo de GPU no profiler
+        self.render_queue = RenderQueue()
+        for pass_index, program, name in (
+                (PASS_OPAQUE, self.shader_texture, "render.world"),
+                (PASS_OPAQUE, self.shader_texture_instanced, "render.instances"),
+                (PASS_OPAQUE, self.shader_color_instanced, "render.magnets"),
+                (PASS_OVERLAY, self.shader_color, "render.outline")):
+            self.render_queue.name_group(pass_index, program, name)
+
     def _init_game_entities(self):
+        layers = self.texture_layers
+        # cenario fixo em um unico buffer: "track" rola a textura em z
+        # (uv.y) e "walls" rola em x (uv.x)
+        world = StaticBatch()
+        world.add("track", const.FLOOR_VERTICES, layers["floor"])
+        world.add("track", const.CEILING_VERTICES, layers["wall"])
+        world.add("track", const.LANE_LEFT_VERTICES, layers["road"])
+        world.add("track", const.LANE_CENTER_VERTICES, layers["road"])
+        world.add("track", const.LANE_RIGHT_VERTICES, layers["road"])
+        world.add("track", const.SEPARATOR_VERTICES, layers["separator"])
+        world.add("walls", const.WALL_VERTICES, layers["wall"])
+        self.world = world.build()
+
         self.meshes = {
-            "lane_left": Mesh(const.LANE_LEFT_VERTICES, 6, has_texture=True),
-            "lane_center": Mesh(const.LANE_CENTER_VERTICES, 6, has_texture=True),
-            "lane_right": Mesh(const.LANE_RIGHT_VERTICES, 6, has_texture=True),
-            "separator": Mesh(const.SEPARATOR_VERTICES, 12, has_texture=True),
-            "floor": Mesh(const.FLOOR_VERTICES, 18, has_texture=True),
-            "walls": Mesh(const.WALL_VERTICES, 12, has_texture=True),
-            "ceiling": Mesh(const.CEILING_VERTICES, 6, has_texture=True),
-            "obs_body": Mesh(const.OBSTACLE_BODY_VERTICES, len(const.OBSTACLE_BODY_VERTICES), has_texture=True),
-            "obs_legs": Mesh(const.OBSTACLE_LEGS_VERTICES, len(const.OBSTACLE_LEGS_VERTICES), has_texture=True),
-            "magnet": Mesh(const.MAGNET_VERTICES, len(const.MAGNET_VERTICES), has_texture=False),
-            "coin": Mesh(const.COIN_VERTICES, 36, has_texture=True)
+            "obs_body": Mesh.indexed(const.OBSTACLE_BODY_VERTICES, has_texture=True, layer=layers["metal"]),
+            "obs_legs": Mesh.indexed(const.OBSTACLE_LEGS_VERTICES, has_texture=True, layer=layers["gold"]),
+            "magnet": Mesh.indexed(const.MAGNET_VERTICES, has_texture=False),
+            "coin": Mesh.indexed(const.COIN_VERTICES, has_texture=True, layer=layers["gold"]),
+            # LOD (alem de LOD_Z): moeda como um quad; o obstaculo distante e o
+            # mesmo corpo, so sem as pernas
+            "coin_far": Mesh.indexed(const.COIN_IMPOSTOR_VERTICES, has_texture=True, layer=layers["gold"]),
+        }
+
+        # um buffer de instancias por tipo de entidade (corpo e pernas
+        # compartilham), e outro para as moedas distantes (LOD). os obstaculos
+        # ficam em ordem de z, os proximos primeiro: o corpo desenha todos e
+        # as pernas so os near_instances["obstacle"] primeiros
+        self.instances = {
+            "obstacle": InstanceBuffer(),
+            "coin": InstanceBuffer(),
+            "coin_far": InstanceBuffer(),
+            "magnet": InstanceBuffer(),
         }
+        self.meshes["obs_body"].attach_instances(self.instances["obstacle"])
+        self.meshes["obs_legs"].attach_instances(self.instances["obstacle"])
+        self.meshes["coin"].attach_instances(self.instances["coin"])
+        self.meshes["coin_far"].attach_instances(self.instances["coin_far"])
+        self.meshes["magnet"].attach_instances(self.instances["magnet"])
+        # (versao da pool, versao do frustum) enviada por ultimo para cada buffer
+        self.uploaded_versions = {}
+        # instancias antes de LOD_Z no inicio de cada buffer, por pool
+        self.near_instances = {}
+
+        # caixa de cada tipo no espaco do modelo, escalada por instancia no culling
+        self.render_bounds = {
+            "obstacle": local_bounds(const.OBSTACLE_BODY_VERTICES, const.OBSTACLE_LEGS_VERTICES),
+            "coin": local_bounds(const.COIN_VERTICES),
+            "magnet": local_bounds(const.MAGNET_VERTICES),
+        }
+        self.frustum = Frustum()
+
+        # o cenario fica na origem: matrizes fixas
+        self.world_model = glm.mat4(1.0)
+        self.world_normal = glm.mat3(1.0)
+
+        # player e creeper chegam pelo AssetManager
+        self.player_mesh = None
+        self.creeper_mesh = None
+
+        self.sim_thread = None
+        self.set_simulation(Simulation(seed=self.seed))
 
-        # carregamento do Player
-        steve_data = load_obj(
-            "src/assets/models/player/steve.obj")
-        self.player_mesh = Mesh(steve_data, len(steve_data), has_texture=True)
+    def _load_texture_layer(self, name, path, critical=False):
+        layer = self.texture_layers[name]
+        self.assets.load(f"texture.{name}", decode_texture, path, const.TEXTURE_LAYER_SIZE,
+                         on_ready=partial(upload_texture_layer, self.texture_array, layer),
+                         critical=critical)
 
-        self.player = Player()
-        self.creeper = Creeper()
+    def _on_player_mesh_loaded(self, mesh_data):
+        vertices, indices = mesh_data
+        self.player_mesh = Mesh(vertices, len(vertices), has_texture=True,
+                                indices=indices, layer=self.texture_layers["player"])
+
+    def _on_creeper_mesh_loaded(self, mesh_data):
+        vertices, indices = mesh_data
+        self.creeper_mesh = Mesh(vertices, len(vertices), has_texture=True,
+                                 indices=indices, layer=self.texture_layers["creeper"])
 
     def _init_game_state(self):
         self.camera_pos = glm.vec3(0.0, 2.5, 3.0)
         self.camera_target = glm.vec3(0.0, 0.0, -10.0)
         self.world_up = glm.vec3(0.0, 1.0, 0.0)
 
-        self.is_game_over = False
-        self.jump_buffer = 0.0
-        self.current_speed = const.OBSTACLE_SPEED
-        self.track_offset = 0.0
-        self.last_frame_time = glfw.get_time()
+        self.accumulator = 0.0
+        self.last_frame_time = 0.0 if self.headless else glfw.get_time()
 
-        self.active_obstacles = []
-        self.active_coins = []
-        self.active_magnets = []
+        # gravacao da sessao e replay (o teclado e ignorado durante o replay)
+        self.recorder = None
+        self.replaying = False
 
-        self._spawn_initial_obstacles()
-        self._spawn_initial_coins()
+        # escopos com gpu=True usam queries GL_TIME_ELAPSED
+        profiler.enabled = const.PROFILE
+        profiler.gpu_timer_factory = GpuTimer
+        self.next_profile_report = 0.0
 
     def run(self):
+        self.load_assets()
+        if const.SIM_THREAD:
+            # a partir daqui a simulacao (e a gravacao) rodam na outra thread
+            self.sim_thread = SimulationThread(self.sim, self.recorder)
+            self.sim_thread.start()
+
         while not glfw.window_should_close(self.window):
             current_time = glfw.get_time()
             delta_time = current_time - self.last_frame_time
             self.last_frame_time = current_time
 
-            glfw.poll_events()
-            self._process_system_input()
-
-            self.update(delta_time)
-            self.render()
-
-            glfw.swap_buffers(self.window)
+            self.run_frame(delta_time)
+            if self.recorder is not None and self.sim_thread is None:
+                self.recorder.frame(delta_time)
+            if self.time_to_first_frame is None:
+                self._mark_first_frame()
+            self._report_profile(current_time)
 
         self.cleanup()
 
-    def update(self, delta_time):
-        if self.is_game_over:
+    def load_assets(self, critical_only=True):
+        # mostra a tela de carregamento ate os assets criticos (ou todos)
+        # ficarem prontos; o restante continua chegando durante o jogo
+        if self.headless:
+            self.assets.wait(critical_only)
             return
 
-        if self.current_speed < const.MAX_SPEED:
-            self.current_speed += const.SPEED_INCREMENT * delta_time
-
-        self.track_offset = (self.track_offset +
-                             const.OBSTACLE_SPEED * delta_time * 0.1) % 100.0
-
-        if self.jump_buffer > 0:
-            self.jump_buffer -= delta_time
-
-        self.player.update(delta_time)
-        self.creeper.update(
-            delta_time, self.player.position.x, self.player.position.y)
-
-        self._update_obstacles(delta_time)
-        self._update_magnets(delta_time)
-        self._update_coins(delta_time)
-        self._check_grounded_status()
-
-    def _update_obstacles(self, delta_time):
-        new_obstacles = []
-        player_aabb = self.player.get_aabb()
-
-        for obstacle in self.active_obstacles:
-            obstacle.update(delta_time, self.current_speed)
+        while (not self.assets.finished(critical_only) and
+               not glfw.window_should_close(self.window)):
+            glfw.poll_events()
+            self._process_system_input()
+            self.assets.poll(timeout=1.0 / 60.0)
+            self._render_loading()
+            glfw.swap_buffers(self.window)
 
-            if self.check_aabb_collision(player_aabb, obstacle.get_aabb()):
-                self._handle_obstacle_collision(obstacle, player_aabb)
-                if self.is_game_over:
-                    return
+        # o tempo de carregamento nao entra no primeiro passo da simulacao
+        self.last_frame_time = glfw.get_time()
 
-            if obstacle.is_out_of_bounds():
-                new_obstacles.append(self.create_obstacle())
-            else:
-                new_obstacles.append(obstacle)
+    def _render_loading(self):
+        # sem shaders nem texturas: fundo e barra de progresso com glClear + scissor
+        glClearColor(0.0, 0.1, 0.05, 1.0)
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
 
-        if not self.active_obstacles and not new_obstacles:
-            self._spawn_initial_obstacles()
+        bar_width = self.width * 3 // 5
+        bar_height = 12
+        x = (self.width - bar_width) // 2
+        y = (self.height - bar_height) // 2
+
+        glEnable(GL_SCISSOR_TEST)
+        glClearColor(0.15, 0.15, 0.15, 1.0)
+        glScissor(x, y, bar_width, bar_height)
+        glClear(GL_COLOR_BUFFER_BIT)
+
+        glClearColor(1.0, 0.6, 0.0, 1.0)
+        glScissor(x, y, int(bar_width * self.assets.progress), bar_height)
+        glClear(GL_COLOR_BUFFER_BIT)
+        glDisable(GL_SCISSOR_TEST)
+
+    def _mark_first_frame(self):
+        # o bench le o atributo; no console so aparece com o profiler ligado
+        self.time_to_first_frame = (time.perf_counter() - self.start_time) * 1000.0
+        if profiler.enabled:
+            print(f"profiler: primeiro frame em {self.time_to_first_frame:.0f} ms")
+
+    def run_frame(self, delta_time, actions=(), render=True):
+        # um frame completo; actions sao as entradas de um replay. sem render,
+        # so a simulacao avanca (replay atrasado em relacao ao relogio)
+        profiler.begin_frame()
+
+        with profiler.scope("poll_events"):
+            if not self.headless:
+                glfw.poll_events()
+                self._process_system_input()
+            for action in actions:
+                self.apply_action(action)
+            # assets nao criticos que terminaram de carregar
+            self.assets.poll()
+
+        with profiler.scope("update"):
+            self.update(delta_time)
 
-        self.active_obstacles = new_obstacles
+        if render:
+            with profiler.scope("render"):
+                self.render()
+
+            if not self.headless:
+                with profiler.scope("swap_buffers"):
+                    glfw.swap_buffers(self.window)
+
+        profiler.end_frame()
+
+    def set_simulation(self, sim):
+        # troca a simulacao (gravacao, replay, cenas dos benchmarks). o snapshot
+        # que o render desenha aponta para as pools vivas da nova simulacao e
+        # e recapturado a cada passo
+        self.sim = sim
+        self.snapshot = Snapshot(copy_pools=False).capture(sim)
+        self.accumulator = 0.0
+
+    def start_recording(self, path):
+        # grava desde o inicio da partida atual
+        self.set_simulation(Simulation(seed=self.seed))
+        self.recorder = SessionRecorder(path, self.seed, self.sim.delta_time)
+
+    def begin_replay(self, session):
+        # a simulacao recomeca com o seed e o passo fixo da gravacao
+        self.set_simulation(Simulation(session.delta_time, seed=session.seed))
+        self.replaying = True
+
+    def replay(self, path, realtime=True):
+        # reproduz uma sessao gravada: em tempo real ou o mais rapido possivel
+        session = load_session(path)
+        self.load_assets(critical_only=False)
+        self.begin_replay(session)
+        if not self.headless:
+            glfw.swap_interval(1 if realtime else 0)
+
+        frames = 0
+        rendered = 0
+        session_time = 0.0
+        start = time.perf_counter()
+        for delta_time, actions in session.frames:
+            if self.window is not None and glfw.window_should_close(self.window):
+                break
 
-    def _handle_obstacle_collision(self, obstacle, player_aabb):
-        feet_y = player_aabb[2]
-        top_obstacle_y = obstacle.position.y + (obstacle.size.y / 2.0)
+            # em tempo real, os frames gravados que ficaram para tras do relogio
+            # so avancam a simulacao: gravacoes da thread da simulacao tem um
+            # frame por passo (120 por segundo), mais que o vsync deixa desenhar
+            session_time += delta_time
+            draw = not realtime or session_time >= time.perf_counter() - start
+            self.run_frame(delta_time, actions, render=draw)
+            frames += 1
+            rendered += draw
+
+            elapsed = time.perf_counter() - start
+            if realtime and session_time > elapsed:
+                time.sleep(session_time - elapsed)
+            self._report_profile(elapsed)
+
+        self.replaying = False
+        elapsed = time.perf_counter() - start
+        return {
+            "frames": frames,
+            "rendered": rendered,
+            "seconds": elapsed,
+            "fps": rendered / elapsed if elapsed else 0.0,
+            "coins": self.sim.player.coins,
+            "game_over": self.sim.is_game_over,
+        }
 
-        is_above = feet_y >= (top_obstacle_y - 0.3)
-        is_falling = self.player.y_velocity <= 0
+    def _report_profile(self, current_time):
+        # resumo dos ultimos frames uma vez por segundo
+        if profiler.enabled and current_time >= self.next_profile_report:
+            print(profiler.summary())
+            self.next_profile_report = current_time + 1.0
 
-        if is_above and is_falling:
-            self.player.land_on_obstacle(top_obstacle_y)
-            if self.jump_buffer > 0:
-                self.player.jump()
-                self.jump_buffer = 0.0
-        else:
-            self.trigger_game_over()
+    def update(self, delta_time):
+        if self.sim_thread is not None:
+            # a simulacao anda sozinha: so pega o ultimo passo publicado
+            self.snapshot = self.sim_thread.acquire()
+            self._play_sim_events(self.sim_thread.poll_events())
+            return
 
-    def _check_grounded_status(self):
-        if self.player.position.y > const.PLAYER_BASE_Y and not self.player.is_jumping:
-            pass
+        # avanca a simulacao em passos fixos, no maximo MAX_STEPS_PER_FRAME por
+        # frame: depois de um travamento o jogo desacelera em vez de gastar
+        # cada vez mais CPU tentando alcancar o relogio
+        step = self.sim.delta_time
+        self.accumulator += delta_time
+        steps = 0
+        while self.accumulator >= step and steps < const.MAX_STEPS_PER_FRAME:
+            self.sim.step()
+            self.snapshot.capture(self.sim, self.snapshot)
+            self.accumulator -= step
+            steps += 1
+        if self.accumulator >= step:
+            self.accumulator %= step
+
+        self._play_sim_events(self.sim.poll_events())
+
+    def _play_sim_events(self, events):
+        if self.headless:
+            return
 
-            if self.player.position.y > const.PLAYER_BASE_Y + 0.1:
-                self.player.is_jumping = True
+        for event in events:
+            if event == "coin":
+                if self.sfx_coin is not None:
+                    self.sfx_coin.play()
+            elif event == "game_over":
+                if self.sfx_game_over is not None:
+                    self.sfx_game_over.play()
+                pygame.mixer.music.stop()
 
     def render(self):
-        if self.is_game_over:
-            glClearColor(0.2, 0.0, 0.0, 1.0)
+        snapshot = self.snapshot
+        # o render fica entre o passo anterior e o ultimo: pelo tempo desde a
+        # publicacao (thread da simulacao) ou pelo que sobrou no acumulador
+        if self.sim_thread is not None:
+            alpha = snapshot.interpolation(time.perf_counter())
         else:
-            glClearColor(0.0, 0.1, 0.05, 1.0)
-
-        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+            alpha = min(1.0, self.accumulator / self.sim.delta_time)
 
         light_pos = glm.vec3(0.0, 10.0, 2.0)
         light_color = glm.vec3(1.0, 1.0, 1.0)
@@ -225,278 +476,133 @@ class Game:
         projection_matrix = glm.perspective(glm.radians(
             45.0), aspect_ratio, 0.1, const.LANE_LENGTH + 10.0)
 
-        glUseProgram(self.shader_texture)
-
-        glUniformMatrix4fv(self.uniforms_texture["view"], 1, GL_FALSE,
-                           glm.value_ptr(view_matrix))
-        glUniformMatrix4fv(self.uniforms_texture["proj"], 1, GL_FALSE,
-                           glm.value_ptr(projection_matrix))
-
-        # iluminacao
-        glUniform3fv(
-            self.uniforms_texture["light_pos"], 1, glm.value_ptr(light_pos))
-        glUniform3fv(
-            self.uniforms_texture["light_color"], 1, glm.value_ptr(light_color))
-        glUniform3fv(
-            self.uniforms_texture["view_pos"], 1, glm.value_ptr(self.camera_pos))
-
-        identity_matrix = glm.mat4(1.0)
-        glUniformMatrix4fv(self.uniforms_texture['model'], 1, GL_FALSE,
-                           glm.value_ptr(identity_matrix))
-
-        glActiveTexture(GL_TEXTURE0)
-
-        glUniform2f(self.uniforms_texture["uv_offset"], 0.0, self.track_offset)
-        # cao
-        glBindTexture(GL_TEXTURE_2D, self.textures["floor"])
-        self.meshes["floor"].draw()
-
-        glBindTexture(GL_TEXTURE_2D, self.textures["wall"])
-        self.meshes["ceiling"].draw()
-
-        # pistas
-        glBindTexture(GL_TEXTURE_2D, self.textures["road"])  # ou texture_chip1
-        self.meshes["lane_left"].draw()
-        self.meshes["lane_center"].draw()
-        self.meshes["lane_right"].draw()
-
-        # separadores
-        glBindTexture(GL_TEXTURE_2D, self.textures["separator"])
-        self.meshes["separator"].draw()
-
-        # paredes
-        glUniform2f(self.uniforms_texture["uv_offset"], self.track_offset, 0.0)
-        glBindTexture(GL_TEXTURE_2D, self.textures["wall"])
-        self.meshes["walls"].draw()
-        glUniform2f(self.uniforms_texture["uv_offset"], 0.0, 0.0)
-
-        # obstaculos
-        glBindTexture(GL_TEXTURE_2D, self.textures["metal"])
-        for obstacle in self.active_obstacles:
-            model = obstacle.get_model_matrix()
-            glUniformMatrix4fv(self.uniforms_texture['model'], 1,
-                               GL_FALSE, glm.value_ptr(model))
-            self.meshes["obs_body"].draw()
-        glBindTexture(GL_TEXTURE_2D, self.textures["gold"])
-        for obstacle in self.active_obstacles:
-            model = obstacle.get_model_matrix()
-            glUniformMatrix4fv(self.uniforms_texture['model'], 1,
-                               GL_FALSE, glm.value_ptr(model))
-            self.meshes["obs_legs"].draw()
-
-        # oedas
-        glBindTexture(GL_TEXTURE_2D, self.textures["gold"])
-        for coin in self.active_coins:
-            model = coin.get_model_matrix()
-            glUniformMatrix4fv(self.uniforms_texture['model'], 1,
-                               GL_FALSE, glm.value_ptr(model))
-            self.meshes["coin"].draw()
+        self.frame_uniforms.update(view_matrix, projection_matrix,
+                                   light_pos, light_color, self.camera_pos)
+        self.frustum.update(projection_matrix * view_matrix)
 
-        # player
-        glBindTexture(GL_TEXTURE_2D, self.textures["player"])
-        model = self.player.get_model_matrix()
-        glUniformMatrix4fv(self.uniforms_texture['model'], 1,
-                           GL_FALSE, glm.value_ptr(model))
-        self.player_mesh.draw()
-
-        self.creeper.draw(self.shader_texture)
-
-        glUseProgram(self.shader_color)
-
-        glUniformMatrix4fv(self.uniforms_color["view"], 1, GL_FALSE,
-                           glm.value_ptr(view_matrix))
-        glUniformMatrix4fv(self.uniforms_color["proj"], 1, GL_FALSE,
-                           glm.value_ptr(projection_matrix))
-
-        glUniform3fv(
-            self.uniforms_color["light_pos"], 1, glm.value_ptr(light_pos))
-        glUniform3fv(
-            self.uniforms_color["light_color"], 1, glm.value_ptr(light_color))
-        glUniform3fv(self.uniforms_color["view_pos"],
-                     1, glm.value_ptr(self.camera_pos))
-
-        glUniformMatrix4fv(self.uniforms_color["model"], 1, GL_FALSE,
-                           glm.value_ptr(glm.mat4(1.0)))
-
-        glUniformMatrix4fv(self.uniforms_color["model"], 1,
-                           GL_FALSE, glm.value_ptr(model))
-
-        glUniform3f(self.uniforms_color["light_color"], 1.0,
-                    0.6, 0.0)
-        self.player_mesh.draw()
-        glUniform3f(self.uniforms_color["light_color"], 1.0,
-                    1.0, 1.0)
-
-        # ima
-        for magnet in self.active_magnets:
-            model = magnet.get_model_matrix()
-            glUniformMatrix4fv(self.uniforms_color["model"], 1,
-                               GL_FALSE, glm.value_ptr(model))
-            self.meshes["magnet"].draw()
-
-    def _update_magnets(self, delta_time):
-        player_aabb = self.player.get_aabb()
-        new_magnets = []
-
-        for magnet in self.active_magnets:
-            magnet.update(delta_time, self.current_speed)
-
-            if not magnet.collected and self.check_aabb_collision(player_aabb, magnet.get_aabb()):
-                magnet.collected = True
-                self.player.activate_magnet()
-                self.sfx_coin.play()
-                continue
-
-            if not magnet.is_out_of_bounds():
-                new_magnets.append(magnet)
-        self.active_magnets = new_magnets
+        # instancias antes de qualquer desenho: a escrita no buffer nao espera
+        # (nem forca o envio de) comandos deste frame
+        with profiler.scope("render.instance_upload"):
+            self._update_instances(snapshot)
 
-    def _update_coins(self, delta_time):
-        player_aabb = self.player.get_aabb()
-        new_coins = []
-        magnet_active = self.player.magnet_timer > 0
+        with profiler.scope("render.record"):
+            self._record_draws(snapshot, alpha)
 
-        for coin in self.active_coins:
-            if coin.collected:
-                continue
+        if snapshot.is_game_over:
+            glClearColor(0.2, 0.0, 0.0, 1.0)
+        else:
+            glClearColor(0.0, 0.1, 0.05, 1.0)
 
-            # atracao do ima
-            direction = self.player.position - coin.position
-            dist = glm.length(direction)
-            should_attract = magnet_active and (dist < const.MAGNET_RADIUS)
+        with profiler.scope("render.clear", gpu=True):
+            glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+
+        # os escopos de GPU de cada grupo ficam dentro do submit
+        with profiler.scope("render.submit"):
+            self.render_queue.submit()
+
+    def _record_draws(self, snapshot, alpha):
+        # grava os desenhos do frame; a ordem de envio e decidida no submit
+        queue = self.render_queue
+        textured = self.uniforms_texture
+        texture = self.texture_array
+        track_offset = snapshot.interpolated_track_offset(alpha)
+
+        # chao, teto, pistas e separadores rolam em z; as paredes, em x
+        world = self._model_uniforms(textured, self.world_model, self.world_normal)
+        queue.draw(self.shader_texture, self.world.mesh, texture=texture,
+                   index_range=self.world.ranges["track"],
+                   uniforms=world + ((textured["uv_offset"], uniform_vec2, (0.0, track_offset)),))
+        queue.draw(self.shader_texture, self.world.mesh, texture=texture,
+                   index_range=self.world.ranges["walls"],
+                   uniforms=world + ((textured["uv_offset"], uniform_vec2, (track_offset, 0.0)),))
 
-            if should_attract:
-                if dist < 1.0:
-                    self.collect_coin(coin)
-                    continue
+        # player
+        player_matrices = snapshot.player_matrices(alpha)
+        no_offset = ((textured["uv_offset"], uniform_vec2, (0.0, 0.0)),)
+        queue.draw(self.shader_texture, self.player_mesh, texture=texture,
+                   uniforms=self._model_uniforms(textured, *player_matrices) + no_offset)
+
+        # creeper (assim que o modelo e a textura chegarem)
+        if self.creeper_mesh is not None and self.assets.is_ready("texture.creeper"):
+            creeper = self._model_uniforms(textured, *snapshot.creeper_matrices(alpha))
+            queue.draw(self.shader_texture, self.creeper_mesh, texture=texture,
+                       uniforms=creeper + no_offset)
+
+        # entidades instanciadas: uma chamada de desenho por tipo
+        z_offset = snapshot.interpolated_z_offset(alpha)
+        for program, program_texture, names in (
+                (self.shader_texture_instanced, texture,
+                 ("obs_body", "obs_legs", "coin", "coin_far")),
+                (self.shader_color_instanced, 0, ("magnet",))):
+            offset = ((self.instance_offset_locations[program], uniform_vec3,
+                       (0.0, 0.0, z_offset)),)
+            for name in names:
+                # pernas: so os obstaculos proximos (LOD)
+                count = self.near_instances.get("obstacle") if name == "obs_legs" else None
+                queue.draw(program, self.meshes[name], texture=program_texture,
+                           uniforms=offset, instanced=True, instance_count=count)
+
+        # contorno: o player de novo com o programa de cor, depois dele
+        outline = self._model_uniforms(self.uniforms_color, *player_matrices)
+        queue.draw(self.shader_color, self.player_mesh, pass_index=PASS_OVERLAY,
+                   uniforms=outline + ((self.uniforms_color["tint"], uniform_vec3,
+                                        (1.0, 0.6, 0.0)),))
+
+    def _model_uniforms(self, uniforms, model, normal_matrix):
+        # as matrizes vem prontas (em cache nas entidades), nada e calculado aqui
+        return ((uniforms["model"], uniform_mat4, model),
+                (uniforms["normal"], uniform_mat3, normal_matrix))
+
+    def _update_instances(self, snapshot):
+        # matrizes model e normal saem direto dos arrays das pools, so das
+        # entidades dentro do frustum; so reenvia quando a pool ou a camera mudaram
+        # (as versoes sao unicas entre pools e copias)
+        for name, pool in snapshot.pools.items():
+            key = (pool.version, self.frustum.version)
+            if self.uploaded_versions.get(name) == key:
+                continue
 
-                direction = glm.normalize(direction)
-                move_speed = const.MAGNET_SPEED_ATTRACTION + self.current_speed
-                coin.position += direction * move_speed * delta_time
+            rows, visible, split = self._visible_instances(
+                pool, self.render_bounds[name], snapshot.advance)
+            far_buffer = self.instances.get(name + "_far")
+            if far_buffer is None:
+                # proximas e distantes no mesmo buffer, as proximas primeiro
+                self.instances[name].update(rows, visible)
+                self.near_instances[name] = int(np.count_nonzero(visible[:split]))
             else:
-                coin.update(delta_time, self.current_speed)
-                if self.check_aabb_collision(player_aabb, coin.get_aabb()):
-                    self.collect_coin(coin)
-                    continue
-
-            if not coin.is_out_of_bounds():
-                new_coins.append(coin)
-
-        self.active_coins = new_coins
-        self._check_spawn_new_coin_group()
-
-    def create_obstacle(self, is_initial=False, z_start=None):
-        x = random.choice(const.LANE_POSITIONS)
-        z = const.CREATE_Z
-
-        if is_initial:
-            limit_near = z_start if z_start else (const.Z_NEAR - 40.0)
-            z = random.uniform(const.CREATE_Z, limit_near)
-
-        h = random.uniform(const.OBSTACLE_MIN_HEIGHT,
-                           const.OBSTACLE_MAX_HEIGHT)
-        d = random.uniform(const.OBSTACLE_MIN_DEPTH, const.OBSTACLE_MAX_DEPTH)
-        return Obstacle(x, z, const.OBSTACLE_WIDTH, h, d)
-
-    def _spawn_initial_obstacles(self):
-        self.active_obstacles = []
-        safe_z_start = const.Z_NEAR - 40.0
-        count = 0
-
-        # loop para evitar infinito
-        for _ in range(const.MAX_OBSTACLES * 5):
-            if count >= const.MAX_OBSTACLES:
-                break
-
-            new_obs = self.create_obstacle(
-                is_initial=True, z_start=safe_z_start)
-            if not self._check_obstacle_overlap(new_obs):
-                self.active_obstacles.append(new_obs)
-                count += 1
-
-    def _check_obstacle_overlap(self, new_obs):
-        margin = 5.0
-        for existing in self.active_obstacles:
-            if abs(new_obs.position.x - existing.position.x) < 0.5:
-                # verifica distancia Z
-                dist_z = abs(new_obs.position.z - existing.position.z)
-                if dist_z < (new_obs.size.z + existing.size.z + margin):
-                    return True
-        return False
-
-    def _spawn_initial_coins(self):
-        z_cursor = const.Z_NEAR - 10.0
-        while z_cursor > const.CREATE_Z:
-            self._spawn_coin_group(z_cursor)
-            z_cursor -= const.GROUP_DISTANCE
-
-    def _spawn_coin_group(self, z_start):
-        # spawnar ima
-        if random.random() < 0.15:
-            magnet_lane = random.choice(const.LANE_POSITIONS)
-            if not self._check_spawn_overlap(magnet_lane, z_start):
-                self.active_magnets.append(Magnet(magnet_lane, z_start))
-                z_start -= 5.0
-
-        # spawna moedas
-        lane_x = random.choice(const.LANE_POSITIONS)
-        num_coins = random.randint(const.GROUP_MIN_SIZE, const.GROUP_MAX_SIZE)
-        for i in range(num_coins):
-            z = z_start - (i * const.COIN_GAP)
-            if not self._check_spawn_overlap(lane_x, z):
-                self.active_coins.append(Coin(lane_x, z))
-
-    def _check_spawn_new_coin_group(self):
-        should_spawn = False
-        if not self.active_coins:
-            should_spawn = True
-        elif self.active_coins[-1].position.z > (const.CREATE_Z + const.GROUP_DISTANCE):
-            should_spawn = True
-
-        if should_spawn and len(self.active_coins) < 100:
-            self._spawn_coin_group(const.CREATE_Z)
-
-    def _check_spawn_overlap(self, x, z, margin=2.0):
-        # cria uma box para checar colisão no ponto de spawn
-        check_min_z = z - 0.5 - margin
-        check_max_z = z + 0.5 + margin
-
-        for obs in self.active_obstacles:
-            aabb = obs.get_aabb()
-
-            if x > (aabb[0] - 0.5) and x < (aabb[1] + 0.5):
-                if check_max_z > aabb[4] and check_min_z < aabb[5]:
-                    return True
-        return False
-
-    def collect_coin(self, coin):
-        coin.collected = True
-        self.player.coins += 1
-        self.sfx_coin.play()
-
-    def trigger_game_over(self):
-        self.player.die()
-        self.sfx_game_over.play()
-        pygame.mixer.music.stop()
-        self.is_game_over = True
+                self.instances[name].update(rows[:split], visible[:split])
+                far_buffer.update(rows[split:], visible[split:])
+            self.uploaded_versions[name] = key
+
+    def _visible_instances(self, pool, bounds, advance=0.0):
+        # as pools estao ordenadas por z: a faixa do frustum e a divisao perto/longe
+        # (LOD_Z) saem de buscas binarias, e so essa faixa passa pelo teste de planos.
+        # advance alarga as caixas em z para cobrir a interpolacao entre passos
+        rows = pool.instance_data()
+        frustum = self.frustum
+        margin = pool.max_half_depth + advance
+        start, stop = pool.z_window(frustum.z_min - margin, frustum.z_max + margin)
+        split = min(stop, pool.z_window(const.LOD_Z, frustum.z_max + margin)[1])
+
+        local_center, local_half = bounds
+        scale = pool.scale[start:stop]
+        half_extents = np.abs(scale) * local_half
+        centers = pool.position[start:stop] + scale * local_center
+        if advance:
+            centers[:, 2] -= advance / 2.0
+            half_extents[:, 2] += advance / 2.0
+        visible = frustum.contains(centers, half_extents)
+
+        # linhas, mascara e inicio das distantes: o InstanceBuffer copia so as
+        # visiveis, direto no buffer
+        return rows[start:stop], visible, split - start
 
     def reset_game(self):
-        self.player.reset()
-        self.active_obstacles.clear()
-        self.active_coins.clear()
-        self.active_magnets.clear()
-
-        self._spawn_initial_obstacles()
-        self._spawn_initial_coins()
-        self.current_speed = const.OBSTACLE_SPEED
-        self.is_game_over = False
+        self.apply_action(ACTION_RESET)
 
-        pygame.mixer.music.play(-1)
-
-    def check_aabb_collision(self, box1, box2):
-        return (box1[0] < box2[1] and box1[1] > box2[0] and
-                box1[2] < box2[3] and box1[3] > box2[2] and
-                box1[4] < box2[5] and box1[5] > box2[4])
+    def _play_music(self):
+        if not self.headless and self.assets.is_ready("music"):
+            pygame.mixer.music.play(-1)
 
     def _process_system_input(self):
         if glfw.get_key(self.window, glfw.KEY_ESCAPE) == glfw.PRESS:
@@ -506,31 +612,77 @@ class Game:
         if action != glfw.PRESS:
             return
 
-        if self.is_game_over:
+        if key == glfw.KEY_F3:
+            self.toggle_profiler()
+            return
+
+        if self.replaying:
+            return
+
+        if self.snapshot.is_game_over:
             if key == glfw.KEY_SPACE:
-                self.reset_game()
+                self.apply_action(ACTION_RESET)
             return
 
         if key == glfw.KEY_LEFT or key == glfw.KEY_A:
-            self.player.move_left()
+            self.apply_action(ACTION_LEFT)
         elif key == glfw.KEY_RIGHT or key == glfw.KEY_D:
-            self.player.move_right()
+            self.apply_action(ACTION_RIGHT)
         elif key == glfw.KEY_SPACE or key == glfw.KEY_W:
-            if not self.player.is_jumping:
-                self.player.jump()
-            else:
-                self.jump_buffer = 0.2
+            self.apply_action(ACTION_JUMP)
+
+    def apply_action(self, action):
+        # toda entrada da partida passa por aqui para poder ser gravada; com a
+        # thread da simulacao, ela aplica e grava antes do proximo passo
+        if self.sim_thread is not None:
+            self.sim_thread.push_action(action)
+        else:
+            if self.recorder is not None:
+                self.recorder.action(action)
+            self.sim.apply_action(action)
+
+        if action == ACTION_RESET:
+            self._play_music()
+
+    def toggle_profiler(self):
+        profiler.enabled = not profiler.enabled
+        if profiler.enabled:
+            profiler.reset()
+        else:
+            profiler.export_chrome_trace(const.PROFILE_TRACE_PATH)
+            print(f"profiler: trace salvo em {const.PROFILE_TRACE_PATH}")
 
     def update_window_size(self, window, width, height):
         self.width, self.height = width, height
         glViewport(0, 0, width, height)
 
     def cleanup(self):
+        # a thread para antes de fechar a gravacao que ela escreve
+        if self.sim_thread is not None:
+            self.sim_thread.stop()
+        if self.recorder is not None:
+            self.recorder.close()
+            print(f"sessao gravada em {self.recorder.path} "
+                  f"({self.recorder.frames} frames, seed {self.seed})")
+        # espera as leituras em andamento e descarta as que nao comecaram
+        self.assets.shutdown()
         for mesh in self.meshes.values():
             mesh.cleanup()
-        self.player_mesh.cleanup()
-        self.creeper.cleanup()
-        glDeleteProgram(self.shader_texture)
-        glDeleteProgram(self.shader_color)
-        pygame.mixer.quit()
-        glfw.terminate()
+        self.world.cleanup()
+        for mesh in (self.player_mesh, self.creeper_mesh):
+            if mesh is not None:
+                mesh.cleanup()
+        delete_shader_program(self.shader_texture)
+        delete_shader_program(self.shader_color)
+        delete_shader_program(self.shader_texture_instanced)
+        delete_shader_program(self.shader_color_instanced)
+        self.frame_uniforms.cleanup()
+        if profiler.enabled:
+            profiler.export_chrome_trace(const.PROFILE_TRACE_PATH)
+        profiler.cleanup()
+        glDeleteTextures(1, [self.texture_array])
+        for instance_buffer in self.instances.values():
+            instance_buffer.cleanup()
+        if not self.headless:
+            pygame.mixer.quit()
+            glfw.terminate()
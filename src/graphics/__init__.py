@@ -1,3 +1,6 @@
+from .culling import *
+from .gpu_timer import *
+from .render_queue import *
 from .shader_loader import *
 from .texture_loader import *
-
+from .uniform_buffer import *
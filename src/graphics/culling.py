@@ -0,0 +1,55 @@
+import itertools
+
+import glm
+import numpy as np
+
+
+class Frustum:
+    # planos do volume de visao extraidos de projection * view; um ponto esta
+    # dentro quando a*x + b*y + c*z + d >= 0 para os seis planos
+    def __init__(self):
+        self.planes = np.zeros((6, 4), dtype=np.float32)
+        # faixa em z ocupada pelo volume, para filtrar as pools (ordenadas por z)
+        self.z_min = 0.0
+        self.z_max = 0.0
+        # muda quando a camera ou a projecao mudam
+        self.version = 0
+        self._matrix = None
+
+    def update(self, view_projection: glm.mat4) -> bool:
+        if view_projection == self._matrix:
+            return False
+        self._matrix = glm.mat4(view_projection)
+
+        m = np.asarray(view_projection, dtype=np.float32)
+        planes = np.array([m[3] + m[0], m[3] - m[0],
+                           m[3] + m[1], m[3] - m[1],
+                           m[3] + m[2], m[3] - m[2]])
+        self.planes[:] = planes / np.linalg.norm(planes[:, :3], axis=1)[:, None]
+
+        # cantos do cubo NDC levados de volta para o mundo
+        inverse = glm.inverse(view_projection)
+        corners_z = []
+        for x, y, z in itertools.product((-1.0, 1.0), repeat=3):
+            corner = inverse * glm.vec4(x, y, z, 1.0)
+            corners_z.append(corner.z / corner.w)
+        self.z_min, self.z_max = min(corners_z), max(corners_z)
+
+        self.version += 1
+        return True
+
+    def contains(self, centers, half_extents):
+        # AABBs (centro, meia extensao) que encostam no frustum; conservador:
+        # uma caixa perto de uma quina pode passar mesmo estando fora
+        normals = self.planes[:, :3]
+        distance = centers @ normals.T + self.planes[:, 3]
+        radius = half_extents @ np.abs(normals).T
+        return np.all(distance + radius >= 0.0, axis=1)
+
+
+def local_bounds(*vertex_lists):
+    # centro e meia extensao das posicoes (3 primeiros floats) dos vertices
+    positions = np.concatenate([np.asarray(vertices, dtype=np.float32)[:, :3]
+                                for vertices in vertex_lists])
+    low, high = positions.min(axis=0), positions.max(axis=0)
+    return (low + high) / 2.0, (high - low) / 2.0
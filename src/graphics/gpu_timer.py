@@ -0,0 +1,29 @@
+import ctypes
+
+from OpenGL.GL import *
+
+
+class GpuTimer:
+    # mede o tempo de GPU com GL_TIME_ELAPSED; usa varias queries em rodizio
+    # para ler o resultado de alguns frames atras sem travar a CPU
+    def __init__(self, latency: int = 3):
+        self.queries = [int(query) for query in glGenQueries(latency)]
+        self.pending = [False] * latency
+        self.index = 0
+        self.elapsed_ms = None
+        self._result = ctypes.c_uint64(0)
+
+    def begin(self):
+        query = self.queries[self.index]
+        if self.pending[self.index]:
+            glGetQueryObjectui64v(query, GL_QUERY_RESULT, ctypes.byref(self._result))
+            self.elapsed_ms = self._result.value / 1e6
+        glBeginQuery(GL_TIME_ELAPSED, query)
+
+    def end(self):
+        glEndQuery(GL_TIME_ELAPSED)
+        self.pending[self.index] = True
+        self.index = (self.index + 1) % len(self.queries)
+
+    def cleanup(self):
+        glDeleteQueries(len(self.queries), self.queries)
@@ -0,0 +1,114 @@
+from operator import itemgetter
+
+import glm
+from OpenGL.GL import *
+
+from core.profiler import profiler
+
+# passes desenhados em ordem; dentro de um pass os comandos sao reordenados
+PASS_OPAQUE = 0
+# geometria redesenhada por cima do que ja foi desenhado (ex.: contorno do player)
+PASS_OVERLAY = 1
+
+
+def uniform_mat4(location, value):
+    glUniformMatrix4fv(location, 1, GL_FALSE, glm.value_ptr(value))
+
+
+def uniform_mat3(location, value):
+    glUniformMatrix3fv(location, 1, GL_FALSE, glm.value_ptr(value))
+
+
+def uniform_vec2(location, value):
+    glUniform2f(location, *value)
+
+
+def uniform_vec3(location, value):
+    glUniform3f(location, *value)
+
+
+_MISSING = object()
+
+
+class RenderQueue:
+    # comandos de desenho de um frame: o render so grava (programa, textura,
+    # mesh e uniforms) e submit() ordena por (pass, programa, textura, VAO) e
+    # envia tudo pulando trocas de estado repetidas. uniforms sao comparados
+    # com o ultimo valor enviado ao programa, tambem entre frames
+    def __init__(self):
+        self._commands = []
+        # (programa, location) -> ultimo valor enviado; valores gravados nao
+        # podem ser alterados depois (matrizes glm em cache sao substituidas)
+        self._uniforms = {}
+        # (pass, programa) -> nome do escopo do profiler (CPU e GPU) do grupo
+        self._scope_names = {}
+
+    def name_group(self, pass_index, program, name):
+        # os desenhos de um pass com um programa ficam juntos depois da
+        # ordenacao: cada grupo vira um escopo com o tempo de GPU dele
+        self._scope_names[(pass_index, program)] = name
+
+    def draw(self, program, mesh, uniforms=(), texture=0, pass_index=PASS_OPAQUE,
+             index_range=None, instanced=False, instance_count=None):
+        # uniforms: (location, funcao uniform_*, valor); index_range: (primeiro
+        # indice, quantidade) de um lote estatico; instance_count: so as
+        # primeiras instancias do buffer (ex.: um nivel de LOD)
+        if not instanced:
+            instance_count = None
+        elif instance_count is None:
+            instance_count = mesh.instance_buffer.count
+        if instance_count == 0:
+            return
+        key = (pass_index, program, texture, mesh.vao, len(self._commands))
+        self._commands.append((key, program, texture, mesh, uniforms,
+                               index_range, instance_count))
+
+    def submit(self):
+        # o estado de programa, textura e VAO vale so para este submit: fora
+        # dele (carregamento de texturas, tela de loading) ele pode mudar
+        commands = self._commands
+        commands.sort(key=itemgetter(0))
+        cache = self._uniforms
+        current_program = current_texture = current_vao = None
+        current_group = scope = None
+
+        for key, program, texture, mesh, uniforms, index_range, instance_count in commands:
+            group = key[:2]
+            if group != current_group:
+                # escopos com gpu=True nao podem ser aninhados: fecha o anterior
+                if scope is not None:
+                    scope.__exit__(None, None, None)
+                name = self._scope_names.get(group) or f"render.pass{group[0]}.program{program}"
+                scope = profiler.scope(name, gpu=True)
+                scope.__enter__()
+                current_group = group
+            if program != current_program:
+                glUseProgram(program)
+                current_program = program
+            if texture and texture != current_texture:
+                glBindTexture(GL_TEXTURE_2D_ARRAY, texture)
+                current_texture = texture
+
+            for location, setter, value in uniforms:
+                cached = cache.get((program, location), _MISSING)
+                if cached is value or (cached is not _MISSING and cached == value):
+                    continue
+                setter(location, value)
+                cache[(program, location)] = value
+
+            if mesh.vao != current_vao:
+                glBindVertexArray(mesh.vao)
+                current_vao = mesh.vao
+
+            if instance_count is not None:
+                mesh.issue_draw_instanced(instance_count)
+            elif index_range is not None:
+                mesh.issue_draw(*index_range)
+            else:
+                mesh.issue_draw()
+
+        if scope is not None:
+            scope.__exit__(None, None, None)
+        if current_vao is not None:
+            glBindVertexArray(0)
+        commands.clear()
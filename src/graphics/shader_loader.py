@@ -1,22 +1,204 @@
+import ctypes
+import hashlib
+import os
+import re
+import struct
+
 from OpenGL.GL import *
 from OpenGL.GL import shaders
 
+from core import asset_cache
+
+# ponto de ligacao do bloco "Frame" (camera e luz), comum a todos os programas
+FRAME_UNIFORM_BINDING = 0
+
+# cache dos programas linkados (glGetProgramBinary): magic, versao, hash das
+# fontes ja preprocessadas + vendor/renderer/versao do driver, formato do binario
+PROGRAM_CACHE_MAGIC = b"BRPROG"
+PROGRAM_CACHE_VERSION = 1
+PROGRAM_CACHE_HEADER = struct.Struct("<6sH32sI")
+
+_INCLUDE_PATTERN = re.compile(r'^\s*#include\s+"([^"]+)"\s*$', re.MULTILINE)
+
+# (programa, nome) -> location, para nao chamar glGetUniformLocation a cada frame
+_uniform_locations = {}
+
+_program_binary_supported = None
+
+
+def load_shader_program(vertex_path: str, fragment_path: str, defines=()) -> int:
+    # defines: variantes do mesmo arquivo, ex.: ("INSTANCED",) ou ("FOG_DENSITY 0.02",)
+    vertex_source = preprocess_shader(vertex_path, defines)
+    fragment_source = preprocess_shader(fragment_path, defines)
+
+    cache_path = _program_cache_path(vertex_path, fragment_path, defines)
+    digest = _program_digest(vertex_source, fragment_source)
+
+    program = _read_program_cache(cache_path, digest)
+    if program is None:
+        program = _link_program(vertex_source, fragment_source)
+        _write_program_cache(program, cache_path, digest)
+
+    # glsl 330 nao tem layout(binding = ...), entao a ligacao e feita aqui
+    block_index = glGetUniformBlockIndex(program, "Frame")
+    if block_index != GL_INVALID_INDEX:
+        glUniformBlockBinding(program, block_index, FRAME_UNIFORM_BINDING)
 
-def load_shader_program(vertex_path: str, fragment_path: str) -> int:
-    vert_shader = _compile_shader_from_file(vertex_path, GL_VERTEX_SHADER)
-    frag_shader = _compile_shader_from_file(fragment_path, GL_FRAGMENT_SHADER)
+    return program
+
+
+def preprocess_shader(path: str, defines=()) -> str:
+    # resolve os #include "arquivo" (relativos ao shader, cada um incluido uma
+    # vez) e coloca os defines logo depois do #version
+    source = _expand_includes(path, set())
+    version, newline, body = source.partition("\n")
+    lines = [version] + [f"#define {define}" for define in defines]
+    return "\n".join(lines) + newline + body
+
+
+def _expand_includes(path: str, included: set) -> str:
+    path = os.path.normpath(path)
+    included.add(path)
+    with open(path, 'r') as f:
+        source = f.read()
+
+    folder = os.path.dirname(path)
 
-    program = shaders.compileProgram(vert_shader, frag_shader)
+    def include(match):
+        include_path = os.path.normpath(os.path.join(folder, match.group(1)))
+        if include_path in included:
+            return ""
+        return _expand_includes(include_path, included)
+
+    return _INCLUDE_PATTERN.sub(include, source)
+
+
+def _link_program(vertex_source: str, fragment_source: str) -> int:
+    vert_shader = shaders.compileShader(vertex_source, GL_VERTEX_SHADER)
+    frag_shader = shaders.compileShader(fragment_source, GL_FRAGMENT_SHADER)
+
+    program = glCreateProgram()
+    glAttachShader(program, vert_shader)
+    glAttachShader(program, frag_shader)
+    # pede ao driver para manter o binario disponivel para o cache
+    if _supports_program_binary():
+        glProgramParameteri(program, GL_PROGRAM_BINARY_RETRIEVABLE_HINT, GL_TRUE)
+    glLinkProgram(program)
 
     # limpeza
+    glDetachShader(program, vert_shader)
+    glDetachShader(program, frag_shader)
     glDeleteShader(vert_shader)
     glDeleteShader(frag_shader)
 
+    if glGetProgramiv(program, GL_LINK_STATUS) != GL_TRUE:
+        log = glGetProgramInfoLog(program)
+        glDeleteProgram(program)
+        raise RuntimeError(f"erro ao linkar o programa: {log}")
+
     return program
 
 
-def _compile_shader_from_file(filepath: str, shader_type: int):
-    with open(filepath, 'r') as f:
-        source_code = f.read()
+def _program_cache_path(vertex_path: str, fragment_path: str, defines) -> str:
+    name = "+".join(os.path.splitext(os.path.basename(path))[0]
+                    for path in (vertex_path, fragment_path))
+    if defines:
+        name += "." + "-".join(re.sub(r"\W+", "_", define) for define in defines)
+    return asset_cache.cache_path("shaders", name + ".prog")
+
+
+def _program_digest(vertex_source: str, fragment_source: str) -> bytes:
+    # o binario so vale para o mesmo driver e as mesmas fontes
+    digest = hashlib.sha256()
+    for part in (glGetString(GL_VENDOR), glGetString(GL_RENDERER), glGetString(GL_VERSION),
+                 vertex_source.encode(), fragment_source.encode()):
+        digest.update(part)
+        digest.update(b"\0")
+    return digest.digest()
+
+
+def _supports_program_binary() -> bool:
+    # GL 4.1 ou ARB_get_program_binary: num driver 3.3 sem a extensao as
+    # funcoes nem existem e os programas so podem ser compilados
+    global _program_binary_supported
+    if _program_binary_supported is None:
+        supported = (bool(glProgramParameteri) and bool(glGetProgramBinary) and
+                     bool(glProgramBinary))
+        if supported:
+            try:
+                supported = glGetIntegerv(GL_NUM_PROGRAM_BINARY_FORMATS) > 0
+            except GLError:
+                supported = False
+        _program_binary_supported = supported
+    return _program_binary_supported
+
+
+def _read_program_cache(cache_path: str, digest: bytes):
+    # devolve o programa restaurado ou None (cache ausente, velho ou recusado)
+    try:
+        with open(cache_path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+
+    if len(data) <= PROGRAM_CACHE_HEADER.size or not _supports_program_binary():
+        return None
+
+    magic, version, cached_digest, binary_format = PROGRAM_CACHE_HEADER.unpack_from(data)
+    if (magic != PROGRAM_CACHE_MAGIC or version != PROGRAM_CACHE_VERSION or
+            cached_digest != digest):
+        return None
+
+    binary = data[PROGRAM_CACHE_HEADER.size:]
+    program = glCreateProgram()
+    try:
+        glProgramBinary(program, binary_format, binary, len(binary))
+        linked = glGetProgramiv(program, GL_LINK_STATUS) == GL_TRUE
+    except GLError:
+        linked = False
+
+    # o driver pode recusar um binario antigo: volta a compilar
+    if not linked:
+        glDeleteProgram(program)
+        return None
+    return program
+
+
+def _write_program_cache(program: int, cache_path: str, digest: bytes):
+    if not _supports_program_binary():
+        return
+
+    length = glGetProgramiv(program, GL_PROGRAM_BINARY_LENGTH)
+    if length <= 0:
+        return
+
+    binary = (ctypes.c_ubyte * length)()
+    written = GLsizei(0)
+    binary_format = GLenum(0)
+    glGetProgramBinary(program, length, ctypes.byref(written),
+                       ctypes.byref(binary_format), binary)
+
+    header = PROGRAM_CACHE_HEADER.pack(PROGRAM_CACHE_MAGIC, PROGRAM_CACHE_VERSION,
+                                       digest, binary_format.value)
+    asset_cache.write_cache(cache_path, header, bytes(binary)[:written.value])
+
+
+def delete_shader_program(program: int):
+    for key in [key for key in _uniform_locations if key[0] == program]:
+        del _uniform_locations[key]
+    glDeleteProgram(program)
+
+
+def get_uniform_location(program: int, name: str) -> int:
+    key = (program, name)
+    location = _uniform_locations.get(key)
+    if location is None:
+        location = glGetUniformLocation(program, name)
+        _uniform_locations[key] = location
+    return location
+
 
-    return shaders.compileShader(source_code, shader_type)
+def get_uniform_locations(program: int, names: dict) -> dict:
+    # {apelido: nome no shader} -> {apelido: location}
+    return {alias: get_uniform_location(program, name)
+            for alias, name in names.items()}
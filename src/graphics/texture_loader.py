@@ -1,27 +1,129 @@
+import os
+import struct
+
+import numpy as np
 from OpenGL.GL import *
 from PIL import Image
 
-def load_texture(path: str) -> int:
+from core import asset_cache
+from core import constants as const
+
+# cabecalho: magic, versao, mtime e tamanho da imagem, largura, altura, niveis
+TEXTURE_CACHE_MAGIC = b"BRTEXT"
+TEXTURE_CACHE_VERSION = 1
+TEXTURE_CACHE_HEADER = struct.Struct("<6sHQQIII4x")
+
+
+def create_texture_array(layer_count: int, size: int = const.TEXTURE_LAYER_SIZE) -> int:
+    # reserva todas as camadas e niveis; o conteudo chega depois, camada a camada
+    level_count = _mip_level_count(size, size)
+
     texture_id = glGenTextures(1)
-    glBindTexture(GL_TEXTURE_2D, texture_id)
+    glBindTexture(GL_TEXTURE_2D_ARRAY, texture_id)
 
-    # configuracao de repetição e filtro
-    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
-    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
-    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER,
+    glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_WRAP_S, GL_REPEAT)
+    glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_WRAP_T, GL_REPEAT)
+    glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_MIN_FILTER,
                     GL_LINEAR_MIPMAP_LINEAR)
-    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+    glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+    glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_MAX_LEVEL, level_count - 1)
+
+    for level in range(level_count):
+        level_size = max(1, size >> level)
+        glTexImage3D(GL_TEXTURE_2D_ARRAY, level, GL_RGBA, level_size, level_size,
+                     layer_count, 0, GL_RGBA, GL_UNSIGNED_BYTE, None)
+
+    return texture_id
 
+
+def upload_texture_layer(texture_id: int, layer: int, decoded):
+    # decoded: resultado de decode_texture(path, size) (na thread do contexto GL)
+    size, _, levels = decoded
+    glBindTexture(GL_TEXTURE_2D_ARRAY, texture_id)
+    for level, data in enumerate(levels):
+        level_size = max(1, size >> level)
+        glTexSubImage3D(GL_TEXTURE_2D_ARRAY, level, 0, 0, layer,
+                        level_size, level_size, 1,
+                        GL_RGBA, GL_UNSIGNED_BYTE, data)
+
+
+def decode_texture(path: str, size: int = None):
+    # devolve (largura, altura, niveis de mipmap em RGBA), usando o cache em disco;
+    # com size a imagem e redimensionada para size x size
+    cache_path = _texture_cache_path(path, size)
+    decoded = _read_texture_cache(cache_path, asset_cache.source_stamp(path))
+    if decoded is None:
+        decoded = bake_texture(path, size)
+    return decoded
+
+
+def bake_texture(path: str, size: int = None):
     # processamento da imagem
     img = Image.open(path).transpose(Image.FLIP_TOP_BOTTOM).convert("RGBA")
+    if size is not None and img.size != (size, size):
+        img = img.resize((size, size), Image.BILINEAR)
 
     width, height = img.size
-    img_data = img.tobytes()
+    levels = [img.tobytes()]
 
-    glTexImage2D(
-        GL_TEXTURE_2D, 0, GL_RGBA, width, height,
-        0, GL_RGBA, GL_UNSIGNED_BYTE, img_data
-    )
-    glGenerateMipmap(GL_TEXTURE_2D)
+    # cadeia de mipmaps gerada aqui, e nao com glGenerateMipmap
+    level_width, level_height = width, height
+    while level_width > 1 or level_height > 1:
+        level_width = max(1, level_width // 2)
+        level_height = max(1, level_height // 2)
+        img = img.resize((level_width, level_height), Image.BOX)
+        levels.append(img.tobytes())
+
+    header = TEXTURE_CACHE_HEADER.pack(
+        TEXTURE_CACHE_MAGIC, TEXTURE_CACHE_VERSION,
+        *asset_cache.source_stamp(path), width, height, len(levels))
+    asset_cache.write_cache(_texture_cache_path(path, size), header, *levels)
+
+    return width, height, levels
+
+
+def _texture_cache_path(path: str, size: int = None) -> str:
+    name = os.path.basename(path)
+    if size is not None:
+        name += f".{size}"
+    return asset_cache.cache_path("textures", name + ".tex", path)
+
+
+def _mip_level_count(width: int, height: int) -> int:
+    return max(width, height).bit_length()
+
+
+def _level_sizes(width: int, height: int, level_count: int):
+    return [max(1, width >> level) * max(1, height >> level) * 4
+            for level in range(level_count)]
+
+
+def _read_texture_cache(cache_path: str, stamp):
+    try:
+        with open(cache_path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+
+    if len(data) < TEXTURE_CACHE_HEADER.size:
+        return None
+
+    (magic, version, mtime_ns, size,
+     width, height, level_count) = TEXTURE_CACHE_HEADER.unpack_from(data)
+    if (magic != TEXTURE_CACHE_MAGIC or version != TEXTURE_CACHE_VERSION or
+            (mtime_ns, size) != stamp):
+        return None
+
+    sizes = _level_sizes(width, height, level_count)
+    if len(data) != TEXTURE_CACHE_HEADER.size + sum(sizes):
+        return None
+
+    view = np.frombuffer(data, dtype=np.uint8)
+    levels = []
+    offset = TEXTURE_CACHE_HEADER.size
+    for level_size in sizes:
+        levels.append(view[offset:offset + level_size])
+        offset += level_size
+
+    return width, height, levels
 
-    return texture_id
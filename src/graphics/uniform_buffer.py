@@ -0,0 +1,37 @@
+import numpy as np
+from OpenGL.GL import *
+
+from .shader_loader import FRAME_UNIFORM_BINDING
+
+
+class FrameUniformBuffer:
+    # bloco std140 "Frame": view, projection, lightPos, lightColor, viewPos
+    # (vec3 ocupam 16 bytes no std140, por isso sao guardados como vec4)
+    def __init__(self, binding: int = FRAME_UNIFORM_BINDING):
+        self.data = np.zeros(44, dtype=np.float32)
+        self.view = self.data[0:16].reshape(4, 4)
+        self.projection = self.data[16:32].reshape(4, 4)
+        self.light_pos = self.data[32:35]
+        self.light_color = self.data[36:39]
+        self.view_pos = self.data[40:43]
+
+        self.ubo = glGenBuffers(1)
+        glBindBuffer(GL_UNIFORM_BUFFER, self.ubo)
+        glBufferData(GL_UNIFORM_BUFFER, self.data.nbytes, None, GL_DYNAMIC_DRAW)
+        glBindBuffer(GL_UNIFORM_BUFFER, 0)
+        glBindBufferBase(GL_UNIFORM_BUFFER, binding, self.ubo)
+
+    def update(self, view, projection, light_pos, light_color, view_pos):
+        # np.asarray de uma matriz glm sai por linha; o GLSL espera por coluna
+        self.view[:] = np.asarray(view).T
+        self.projection[:] = np.asarray(projection).T
+        self.light_pos[:] = light_pos
+        self.light_color[:] = light_color
+        self.view_pos[:] = view_pos
+
+        glBindBuffer(GL_UNIFORM_BUFFER, self.ubo)
+        glBufferSubData(GL_UNIFORM_BUFFER, 0, self.data.nbytes, self.data)
+        glBindBuffer(GL_UNIFORM_BUFFER, 0)
+
+    def cleanup(self):
+        glDeleteBuffers(1, [self.ubo])
@@ -1,6 +1,39 @@
-import game
+import argparse
+
+import OpenGL
+
+from core import constants as const
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Byte Runner")
+    parser.add_argument("--seed", type=int,
+                        help="seed da partida (padrao: aleatorio)")
+    parser.add_argument("--record", metavar="ARQUIVO",
+                        help="grava as entradas e os frames da partida")
+    parser.add_argument("--replay", metavar="ARQUIVO",
+                        help="reproduz uma sessao gravada com --record")
+    parser.add_argument("--fast", action="store_true",
+                        help="no replay, roda o mais rapido possivel")
+    parser.add_argument("--gl-debug", action="store_true",
+                        help="checa erros do OpenGL a cada chamada (mais lento)")
+    return parser.parse_args()
+
 
 if __name__ == "__main__":
-    app = game.Game()
-    app.run()
+    args = parse_args()
+    # so vale se for definido antes do primeiro import de OpenGL.GL
+    OpenGL.ERROR_CHECKING = const.GL_ERROR_CHECKING or args.gl_debug
+    import game
+
+    app = game.Game(seed=args.seed)
 
+    if args.replay:
+        result = app.replay(args.replay, realtime=not args.fast)
+        print(f"replay: {result['frames']} frames em {result['seconds']:.2f} s "
+              f"({result['fps']:.1f} fps), moedas {result['coins']}")
+        app.cleanup()
+    else:
+        if args.record:
+            app.start_recording(args.record)
+        app.run()
@@ -0,0 +1,169 @@
+import queue
+import threading
+import time
+
+from core import constants as const
+from entities import PoolSnapshot
+
+# nomes das pools no snapshot (os mesmos dos buffers de instancia do render)
+POOL_NAMES = ("obstacle", "coin", "magnet")
+
+
+class Snapshot:
+    # tudo que o render precisa de um passo da simulacao. com copy_pools as
+    # pools sao copiadas (thread da simulacao); sem, o snapshot aponta para as
+    # pools vivas (simulacao e render na mesma thread)
+    def __init__(self, copy_pools: bool = True):
+        self.copy_pools = copy_pools
+        self.pools = {name: PoolSnapshot() for name in POOL_NAMES} if copy_pools else {}
+        self.time = 0.0
+        self.delta_time = const.FIXED_DELTA_TIME
+
+    def capture(self, sim, previous=None):
+        # previous e o snapshot do passo anterior (pode ser o proprio snapshot,
+        # por isso as matrizes dele sao lidas antes de tudo)
+        previous_matrices = None
+        if previous is not None:
+            previous_matrices = (previous.player_model, previous.player_normal,
+                                 previous.creeper_model, previous.creeper_normal)
+        self.time = time.perf_counter()
+        self.delta_time = sim.delta_time
+        self.is_game_over = sim.is_game_over
+
+        # quanto o cenario andou neste passo, para interpolar ate o proximo
+        moving = not sim.is_game_over
+        self.track_offset = sim.track_offset
+        self.track_advance = const.OBSTACLE_SPEED * sim.delta_time * 0.1 if moving else 0.0
+        self.advance = sim.current_speed * sim.delta_time if moving else 0.0
+
+        # as matrizes em cache nao sao alteradas, so substituidas
+        self.player_model = sim.player.get_model_matrix()
+        self.player_normal = sim.player.get_normal_matrix()
+        self.creeper_model = sim.creeper.get_model_matrix()
+        self.creeper_normal = sim.creeper.get_normal_matrix()
+        if previous_matrices is None:
+            previous_matrices = (self.player_model, self.player_normal,
+                                 self.creeper_model, self.creeper_normal)
+        (self.player_model_prev, self.player_normal_prev,
+         self.creeper_model_prev, self.creeper_normal_prev) = previous_matrices
+
+        pools = zip(POOL_NAMES, (sim.obstacles, sim.coins, sim.magnets))
+        if self.copy_pools:
+            for name, pool in pools:
+                self.pools[name].copy_from(pool)
+        else:
+            self.pools.update(pools)
+        return self
+
+    def interpolation(self, now: float) -> float:
+        # fracao do passo ja decorrida desde a publicacao (0 = passo anterior)
+        alpha = (now - self.time) / self.delta_time
+        return min(1.0, max(0.0, alpha))
+
+    def player_matrices(self, alpha: float):
+        return (_mix(self.player_model_prev, self.player_model, alpha),
+                _mix(self.player_normal_prev, self.player_normal, alpha))
+
+    def creeper_matrices(self, alpha: float):
+        return (_mix(self.creeper_model_prev, self.creeper_model, alpha),
+                _mix(self.creeper_normal_prev, self.creeper_normal, alpha))
+
+    def interpolated_track_offset(self, alpha: float) -> float:
+        return self.track_offset - (1.0 - alpha) * self.track_advance
+
+    def interpolated_z_offset(self, alpha: float) -> float:
+        # as entidades andam juntas em z: entre dois passos basta um deslocamento
+        return -(1.0 - alpha) * self.advance
+
+
+def _mix(previous, current, alpha):
+    # as rotacoes entre dois passos sao pequenas: a media linear basta
+    if alpha >= 1.0 or previous is current:
+        return current
+    return previous + (current - previous) * alpha
+
+
+class SimulationThread:
+    # roda a simulacao em passos fixos em uma thread propria e publica um
+    # Snapshot por passo. sao tres snapshots: o ultimo publicado, o que o
+    # render esta lendo e o que esta sendo escrito, entao nenhum e alterado
+    # enquanto outra thread o usa
+    def __init__(self, sim, recorder=None, max_lag_steps: int = const.MAX_STEPS_PER_FRAME):
+        self.sim = sim
+        self.recorder = recorder
+        self.max_lag = max_lag_steps * sim.delta_time
+
+        self._snapshots = [Snapshot() for _ in range(3)]
+        self._latest = None
+        self._reading = None
+        self._events = []
+        self._lock = threading.Lock()
+        self._actions = queue.SimpleQueue()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="simulation", daemon=True)
+
+    def start(self):
+        self._publish()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def push_action(self, action: int):
+        # aplicada (e gravada) antes do proximo passo
+        self._actions.put(action)
+
+    def acquire(self) -> Snapshot:
+        # snapshot mais recente; continua intacto ate a proxima chamada
+        with self._lock:
+            self._reading = self._latest
+            return self._latest
+
+    def poll_events(self):
+        with self._lock:
+            events = self._events
+            self._events = []
+        return events
+
+    def _run(self):
+        sim = self.sim
+        next_step = time.perf_counter()
+
+        while not self._stop.is_set():
+            while True:
+                try:
+                    action = self._actions.get_nowait()
+                except queue.Empty:
+                    break
+                if self.recorder is not None:
+                    self.recorder.action(action)
+                sim.apply_action(action)
+
+            sim.step()
+            if self.recorder is not None:
+                # cada passo vira um frame da sessao, com o delta do passo fixo
+                self.recorder.frame(sim.delta_time)
+
+            events = sim.poll_events()
+            if events:
+                with self._lock:
+                    self._events.extend(events)
+            self._publish()
+
+            next_step += sim.delta_time
+            delay = next_step - time.perf_counter()
+            if delay > 0.0:
+                self._stop.wait(delay)
+            elif delay < -self.max_lag:
+                # atrasou demais (ex.: janela arrastada): segue do tempo atual
+                next_step = time.perf_counter()
+
+    def _publish(self):
+        with self._lock:
+            snapshot = next(s for s in self._snapshots
+                            if s is not self._latest and s is not self._reading)
+        snapshot.capture(self.sim, self._latest)
+        with self._lock:
+            self._latest = snapshot
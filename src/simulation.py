@@ -0,0 +1,320 @@
+import random
+import numpy as np
+
+from core import constants as const
+from core.profiler import profiler
+from core.replay import ACTION_JUMP, ACTION_LEFT, ACTION_RESET, ACTION_RIGHT
+from entities import Player, CoinPool, Creeper, MagnetPool, ObstaclePool
+
+
+class Simulation:
+    # logica do jogo sem janela, OpenGL ou audio, avancada em passos fixos
+    def __init__(self, delta_time: float = const.FIXED_DELTA_TIME, seed=None,
+                 substeps: int = const.PHYSICS_SUBSTEPS):
+        self.delta_time = delta_time
+        # cada passo pode ser dividido em subpassos menores (mais precisao na
+        # fisica do pulo e nas colisoes, mesma taxa de passos)
+        self.substeps = max(1, substeps)
+        # gerador proprio: o mesmo seed (e as mesmas entradas) repete a partida
+        self.seed = seed
+        self.rng = random.Random(seed)
+
+        self.player = Player()
+        self.creeper = Creeper()
+
+        self.obstacles = ObstaclePool()
+        self.coins = CoinPool()
+        self.magnets = MagnetPool()
+
+        self.events = []
+        self._init_state()
+
+    def _init_state(self):
+        self.is_game_over = False
+        self.jump_buffer = 0.0
+        self.current_speed = const.OBSTACLE_SPEED
+        self.track_offset = 0.0
+        self.time = 0.0
+
+        self.obstacles.clear()
+        self.coins.clear()
+        self.magnets.clear()
+
+        self._spawn_initial_obstacles()
+        self._spawn_initial_coins()
+
+    def step(self):
+        substep = self.delta_time / self.substeps
+        for _ in range(self.substeps):
+            self.update(substep)
+        self.time += self.delta_time
+
+    def poll_events(self):
+        # devolve e limpa os eventos gerados desde a ultima chamada
+        events = self.events
+        self.events = []
+        return events
+
+    def update(self, delta_time):
+        if self.is_game_over:
+            return
+
+        if self.current_speed < const.MAX_SPEED:
+            self.current_speed += const.SPEED_INCREMENT * delta_time
+
+        self.track_offset = (self.track_offset +
+                             const.OBSTACLE_SPEED * delta_time * 0.1) % 100.0
+
+        if self.jump_buffer > 0:
+            self.jump_buffer -= delta_time
+
+        # a colisao com os obstaculos cobre o caminho do player no passo
+        previous_aabb = self.player.get_aabb()
+        self.player.update(delta_time)
+        with profiler.scope("creeper.update"):
+            self.creeper.update(
+                delta_time, self.player.position.x, self.player.position.y)
+
+        with profiler.scope("sim.obstacles"):
+            self._update_obstacles(delta_time, previous_aabb)
+        with profiler.scope("sim.magnets"):
+            self._update_magnets(delta_time)
+        with profiler.scope("sim.coins"):
+            self._update_coins(delta_time)
+        self._check_grounded_status()
+
+    def _update_obstacles(self, delta_time, previous_aabb):
+        obstacles = self.obstacles
+        player_aabb = self.player.get_aabb()
+
+        # teste continuo: mesmo um passo longo em velocidade maxima nao deixa um
+        # obstaculo atravessar o player entre duas posicoes
+        distance = self.current_speed * delta_time
+        obstacles.advance(distance)
+
+        hits = obstacles.hits(player_aabb, sweep=distance, previous_box=previous_aabb)
+        for index in np.flatnonzero(hits):
+            self._handle_obstacle_collision(index, player_aabb)
+            if self.is_game_over:
+                return
+
+        # obstaculos que sairam da tela sao trocados por novos
+        for _ in range(obstacles.remove_passed()):
+            self.create_obstacle()
+
+        if not obstacles.count:
+            self._spawn_initial_obstacles()
+
+    def _handle_obstacle_collision(self, index, player_aabb):
+        feet_y = player_aabb[2]
+        top_obstacle_y = float(self.obstacles.position[index, 1] +
+                               self.obstacles.size[index, 1] / 2.0)
+
+        is_above = feet_y >= (top_obstacle_y - 0.3)
+        is_falling = self.player.y_velocity <= 0
+
+        if is_above and is_falling:
+            self.player.land_on_obstacle(top_obstacle_y)
+            if self.jump_buffer > 0:
+                self.player.jump()
+                self.jump_buffer = 0.0
+        else:
+            self.trigger_game_over()
+
+    def _check_grounded_status(self):
+        if self.player.position.y > const.PLAYER_BASE_Y and not self.player.is_jumping:
+            pass
+
+            if self.player.position.y > const.PLAYER_BASE_Y + 0.1:
+                self.player.is_jumping = True
+
+    def _update_magnets(self, delta_time):
+        magnets = self.magnets
+        magnets.advance(self.current_speed * delta_time)
+
+        collected = magnets.hits(self.player.get_aabb())
+        for _ in range(int(np.count_nonzero(collected))):
+            self.player.activate_magnet()
+            self.events.append("coin")
+
+        magnets.remove(collected)
+        magnets.remove_passed()
+
+    def _update_coins(self, delta_time):
+        coins = self.coins
+        player_aabb = self.player.get_aabb()
+        collected = np.zeros(coins.count, dtype=bool)
+        attracted = np.zeros(coins.count, dtype=bool)
+        pulled = None
+
+        # atracao do ima: so as moedas na faixa de z ao alcance do ima
+        if self.player.magnet_timer > 0:
+            player_z = float(self.player.position.z)
+            start, stop = coins.z_window(player_z - const.MAGNET_RADIUS,
+                                         player_z + const.MAGNET_RADIUS)
+            position = coins.position[start:stop].copy()
+            direction = np.asarray(self.player.position, dtype=np.float32) - position
+            dist = np.sqrt(np.einsum("ij,ij->i", direction, direction))
+            near = dist < const.MAGNET_RADIUS
+            reached = near & (dist < 1.0)
+            moving = near & ~reached
+
+            move_speed = const.MAGNET_SPEED_ATTRACTION + self.current_speed
+            position[moving] += (direction[moving] / dist[moving, None]
+                                 ) * (move_speed * delta_time)
+
+            attracted[start:stop] = near
+            collected[start:stop] = reached
+            pulled = (start + np.flatnonzero(near), position[near])
+
+        # as moedas livres andam com a pista; as atraidas ficam onde o ima levou
+        coins.advance(self.current_speed * delta_time)
+        if pulled is not None:
+            coins.move(*pulled)
+
+        # moedas puxadas pelo ima podem sair da ordem por z
+        order = coins.restore_order()
+        if order is not None:
+            collected = collected[order]
+            attracted = attracted[order]
+        collected |= ~attracted & coins.hits(player_aabb)
+
+        for _ in range(int(np.count_nonzero(collected))):
+            self.collect_coin()
+
+        coins.remove(collected)
+        coins.remove_passed()
+        self._check_spawn_new_coin_group()
+
+    def _roll_obstacle(self, is_initial=False, z_start=None):
+        x = self.rng.choice(const.LANE_POSITIONS)
+        z = const.CREATE_Z
+
+        if is_initial:
+            limit_near = z_start if z_start else (const.Z_NEAR - 40.0)
+            z = self.rng.uniform(const.CREATE_Z, limit_near)
+
+        h = self.rng.uniform(const.OBSTACLE_MIN_HEIGHT,
+                           const.OBSTACLE_MAX_HEIGHT)
+        d = self.rng.uniform(const.OBSTACLE_MIN_DEPTH, const.OBSTACLE_MAX_DEPTH)
+        return x, z, h, d
+
+    def create_obstacle(self, is_initial=False, z_start=None):
+        x, z, h, d = self._roll_obstacle(is_initial, z_start)
+        return self.obstacles.spawn(x, z, const.OBSTACLE_WIDTH, h, d)
+
+    def _spawn_initial_obstacles(self):
+        self.obstacles.clear()
+        safe_z_start = const.Z_NEAR - 40.0
+        count = 0
+
+        # loop para evitar infinito
+        for _ in range(const.MAX_OBSTACLES * 5):
+            if count >= const.MAX_OBSTACLES:
+                break
+
+            x, z, h, d = self._roll_obstacle(
+                is_initial=True, z_start=safe_z_start)
+            if not self._check_obstacle_overlap(x, z, d):
+                self.obstacles.spawn(x, z, const.OBSTACLE_WIDTH, h, d)
+                count += 1
+
+    def _check_obstacle_overlap(self, x, z, depth):
+        margin = 5.0
+        obstacles = self.obstacles
+        reach = depth + 2.0 * obstacles.max_half_depth + margin
+        start, stop = obstacles.z_window(z - reach, z + reach)
+        position = obstacles.position[start:stop]
+        size = obstacles.size[start:stop]
+
+        same_lane = np.abs(position[:, 0] - x) < 0.5
+        # verifica distancia Z
+        too_close = np.abs(position[:, 2] - z) < (depth + size[:, 2] + margin)
+        return bool(np.any(same_lane & too_close))
+
+    def _spawn_initial_coins(self):
+        z_cursor = const.Z_NEAR - 10.0
+        while z_cursor > const.CREATE_Z:
+            self._spawn_coin_group(z_cursor)
+            z_cursor -= const.GROUP_DISTANCE
+
+    def _spawn_coin_group(self, z_start):
+        # spawnar ima
+        if self.rng.random() < 0.15:
+            magnet_lane = self.rng.choice(const.LANE_POSITIONS)
+            if not self._check_spawn_overlap(magnet_lane, z_start):
+                self.magnets.spawn(magnet_lane, z_start)
+                z_start -= 5.0
+
+        # spawna moedas
+        lane_x = self.rng.choice(const.LANE_POSITIONS)
+        num_coins = self.rng.randint(const.GROUP_MIN_SIZE, const.GROUP_MAX_SIZE)
+        for i in range(num_coins):
+            z = z_start - (i * const.COIN_GAP)
+            if not self._check_spawn_overlap(lane_x, z):
+                self.coins.spawn(lane_x, z)
+
+    def _check_spawn_new_coin_group(self):
+        should_spawn = False
+        if not self.coins.count:
+            should_spawn = True
+        elif self.coins.position[self.coins.count - 1, 2] > (const.CREATE_Z + const.GROUP_DISTANCE):
+            should_spawn = True
+
+        if should_spawn and self.coins.count < const.MAX_COINS:
+            self._spawn_coin_group(const.CREATE_Z)
+
+    def _check_spawn_overlap(self, x, z, margin=2.0):
+        # cria uma box para checar colisão no ponto de spawn
+        check_min_z = z - 0.5 - margin
+        check_max_z = z + 0.5 + margin
+
+        obstacles = self.obstacles
+        start, stop = obstacles.z_window(check_min_z - obstacles.max_half_depth,
+                                         check_max_z + obstacles.max_half_depth)
+        box_min, box_max = obstacles.aabb(start, stop)
+        in_lane = (x > box_min[:, 0] - 0.5) & (x < box_max[:, 0] + 0.5)
+        in_depth = (check_max_z > box_min[:, 2]) & (check_min_z < box_max[:, 2])
+        return bool(np.any(in_lane & in_depth))
+
+    def collect_coin(self):
+        self.player.coins += 1
+        self.events.append("coin")
+
+    def trigger_game_over(self):
+        self.player.die()
+        self.events.append("game_over")
+        self.is_game_over = True
+
+    def reset(self):
+        self.player.reset()
+        self._init_state()
+
+    # entradas do jogador
+    def move_left(self):
+        if not self.is_game_over:
+            self.player.move_left()
+
+    def move_right(self):
+        if not self.is_game_over:
+            self.player.move_right()
+
+    def jump(self):
+        if self.is_game_over:
+            return
+
+        if not self.player.is_jumping:
+            self.player.jump()
+        else:
+            self.jump_buffer = 0.2
+
+    def apply_action(self, action: int):
+        # acoes gravadas nas sessoes (core.replay)
+        if action == ACTION_LEFT:
+            self.move_left()
+        elif action == ACTION_RIGHT:
+            self.move_right()
+        elif action == ACTION_JUMP:
+            self.jump()
+        elif action == ACTION_RESET:
+            self.reset()